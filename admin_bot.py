@@ -7,7 +7,7 @@ import io
 import csv
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters
+from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, TypeHandler, ContextTypes, filters
 from telegram.constants import ParseMode
 
 from models import db, User, Quiz, Question, QuestionOption, QuizAttempt, Answer, SystemLog, AdminUser
@@ -157,7 +157,7 @@ Use any command to get started!"""
             await update.message.reply_text("❌ Access denied.")
             return
         
-        quizzes = self.db_manager.get_all_quizzes()
+        quizzes = self.db_manager.get_quizzes_list()
         
         if not quizzes:
             await update.message.reply_text(
@@ -171,7 +171,7 @@ Use any command to get started!"""
         for quiz in quizzes:
             status_emoji = "✅" if quiz.is_active else "❌"
             quiz_text += f"{status_emoji} **{quiz.title}**\n"
-            quiz_text += f"   Questions: {len(quiz.questions)} | Attempts: {len(quiz.attempts)}\n"
+            quiz_text += f"   Questions: {quiz.question_count} | Attempts: {quiz.attempt_count}\n"
             quiz_text += f"   Created: {quiz.created_at.strftime('%Y-%m-%d')}\n\n"
             
             keyboard.append([
@@ -198,25 +198,21 @@ Use any command to get started!"""
             await update.message.reply_text("❌ Access denied.")
             return
         
-        users = self.db_manager.get_all_users()
+        total_users = self.db_manager.count_users()
         
-        if not users:
+        if not total_users:
             await update.message.reply_text("👥 No users found.")
             return
         
         # Paginate users (show 10 per page)
         page_size = 10
-        total_pages = (len(users) + page_size - 1) // page_size
+        total_pages = (total_users + page_size - 1) // page_size
+        users = self.db_manager.get_users_list(limit=page_size)
         
         await self.show_users_page(update.message, users, 0, total_pages)
     
-    async def show_users_page(self, message, users: List[User], page: int, total_pages: int) -> None:
+    async def show_users_page(self, message, page_users: List, page: int, total_pages: int) -> None:
         """Show a page of users"""
-        page_size = 10
-        start_idx = page * page_size
-        end_idx = min(start_idx + page_size, len(users))
-        page_users = users[start_idx:end_idx]
-        
         users_text = f"👥 **Users (Page {page + 1}/{total_pages})**\n\n"
         
         keyboard = []
@@ -226,7 +222,7 @@ Use any command to get started!"""
             
             users_text += f"{status_emoji}{admin_emoji} **{user.first_name} {user.last_name or ''}**\n"
             users_text += f"   @{user.username or 'No username'} | ID: {user.telegram_id}\n"
-            users_text += f"   Quizzes taken: {len(user.quiz_attempts)}\n"
+            users_text += f"   Quizzes taken: {user.attempt_count}\n"
             users_text += f"   Last activity: {user.last_activity.strftime('%Y-%m-%d %H:%M') if user.last_activity else 'Never'}\n\n"
             
             keyboard.append([
@@ -362,10 +358,11 @@ Use any command to get started!"""
             return
         
         # Calculate quiz statistics
-        total_attempts = len(quiz.attempts)
-        completed_attempts = len([a for a in quiz.attempts if a.status == 'completed'])
-        average_score = sum([a.percentage for a in quiz.attempts if a.percentage is not None]) / max(completed_attempts, 1)
-        pass_rate = len([a for a in quiz.attempts if a.is_passed]) / max(completed_attempts, 1) * 100
+        stats = self.db_manager.get_quiz_attempt_stats(quiz_id)
+        total_attempts = stats['total_attempts']
+        completed_attempts = stats['completed_attempts']
+        average_score = stats['average_score']
+        pass_rate = stats['pass_rate']
         
         details_text = f"""📝 **Quiz Details: {quiz.title}**
 
@@ -564,6 +561,13 @@ Use any command to get started!"""
         
         # Message handlers
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_text_message))
+        
+        # Runs after the handlers above so each update gets a fresh database session
+        application.add_handler(TypeHandler(Update, self.release_db_session), group=1)
+    
+    async def release_db_session(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Discard the database session used while handling an update"""
+        self.db_manager.close_session()
 
 def create_admin_bot_application(config: Config) -> Application:
     """Create and configure the admin bot application"""
@@ -5,13 +5,13 @@ from typing import Dict, List, Optional
 import json
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters
+from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, TypeHandler, ContextTypes, filters
 from telegram.constants import ParseMode
 
 from models import db, User, Quiz, Question, QuestionOption, QuizAttempt, Answer, SystemLog
 from config import Config
 from utils.email_service import EmailService
-from utils.database import DatabaseManager
+from utils.database import AsyncDatabaseManager
 from utils.security import SecurityManager
 
 # Configure logging
@@ -24,10 +24,11 @@ logger = logging.getLogger(__name__)
 class TelegramQuizBot:
     def __init__(self, config: Config):
         self.config = config
-        self.db_manager = DatabaseManager(config)
+        self.db_manager = AsyncDatabaseManager(config)
         self.email_service = EmailService(config)
         self.security_manager = SecurityManager(config)
         self.user_sessions: Dict[int, Dict] = {}  # Store user session data
+        self._activity_task: Optional[asyncio.Task] = None
         
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle /start command"""
@@ -43,10 +44,6 @@ class TelegramQuizBot:
             )
             return
         
-        # Update last activity
-        db_user.last_activity = datetime.now(timezone.utc)
-        self.db_manager.save_changes()
-        
         welcome_message = f"""🎯 **Welcome to Quiz Bot, {db_user.first_name}!**
 
 I can help you take quizzes and tests. Here's what you can do:
@@ -107,7 +104,7 @@ Contact an administrator if you encounter any issues."""
             return
         
         # Get active quizzes
-        active_quizzes = self.db_manager.get_active_quizzes()
+        active_quizzes = await self.db_manager.get_active_quizzes()
         
         if not active_quizzes:
             await update.message.reply_text(
@@ -119,7 +116,7 @@ Contact an administrator if you encounter any issues."""
         keyboard = []
         for quiz in active_quizzes:
             # Check if user has attempts left
-            attempt_count = self.db_manager.get_user_quiz_attempts(db_user.id, quiz.id)
+            attempt_count = await self.db_manager.get_user_quiz_attempts(db_user.id, quiz.id)
             attempts_left = quiz.max_attempts - attempt_count
             
             if attempts_left > 0:
@@ -152,7 +149,7 @@ Contact an administrator if you encounter any issues."""
         user = update.effective_user
         db_user = await self.get_or_create_user(user)
         
-        attempts = self.db_manager.get_user_attempts(db_user.id)
+        attempts = await self.db_manager.get_user_attempts(db_user.id)
         
         if not attempts:
             await update.message.reply_text(
@@ -180,6 +177,7 @@ Contact an administrator if you encounter any issues."""
         """Handle /profile command - show and manage user profile"""
         user = update.effective_user
         db_user = await self.get_or_create_user(user)
+        attempt_count = await self.db_manager.get_user_attempt_count(db_user.id)
         
         profile_text = f"""👤 **Your Profile:**
 
@@ -188,7 +186,7 @@ Contact an administrator if you encounter any issues."""
 **Phone:** {db_user.phone_number or 'Not set'}
 **Email:** {db_user.email or 'Not set'}
 **Member since:** {db_user.created_at.strftime('%Y-%m-%d')}
-**Total quizzes taken:** {len(db_user.quiz_attempts)}"""
+**Total quizzes taken:** {attempt_count}"""
         
         keyboard = [
             [InlineKeyboardButton("📧 Update Email", callback_data="update_email")],
@@ -231,14 +229,14 @@ Contact an administrator if you encounter any issues."""
     
     async def show_quiz_info(self, query, db_user: User, quiz_id: int) -> None:
         """Show detailed information about a quiz"""
-        quiz = self.db_manager.get_quiz_by_id(quiz_id)
+        quiz = await self.db_manager.get_quiz_with_questions(quiz_id)
         
         if not quiz or not quiz.is_active:
             await query.edit_message_text("❌ Quiz not found or no longer available.")
             return
         
         # Check attempts left
-        attempt_count = self.db_manager.get_user_quiz_attempts(db_user.id, quiz.id)
+        attempt_count = await self.db_manager.get_user_quiz_attempts(db_user.id, quiz.id)
         attempts_left = quiz.max_attempts - attempt_count
         
         if attempts_left <= 0:
@@ -273,7 +271,7 @@ Contact an administrator if you encounter any issues."""
     
     async def start_quiz(self, query, db_user: User, quiz_id: int) -> None:
         """Start a new quiz attempt"""
-        quiz = self.db_manager.get_quiz_by_id(quiz_id)
+        quiz = await self.db_manager.get_quiz_by_id(quiz_id)
         
         if not quiz or not quiz.is_active:
             await query.edit_message_text("❌ Quiz not found or no longer available.")
@@ -287,7 +285,7 @@ Contact an administrator if you encounter any issues."""
             status='in_progress'
         )
         
-        self.db_manager.add_and_commit(attempt)
+        await self.db_manager.add_and_commit(attempt)
         
         # Initialize user session
         self.user_sessions[db_user.telegram_id] = {
@@ -316,7 +314,7 @@ Contact an administrator if you encounter any issues."""
             await query.edit_message_text("❌ No active quiz session found. Please start a new quiz.")
             return
         
-        quiz = self.db_manager.get_quiz_by_id(session['quiz_id'])
+        quiz = await self.db_manager.get_quiz_with_questions(session['quiz_id'])
         questions = quiz.questions
         
         if question_index >= len(questions):
@@ -410,31 +408,32 @@ Contact an administrator if you encounter any issues."""
             await query.edit_message_text("❌ No active quiz session found.")
             return
         
-        attempt = self.db_manager.get_quiz_attempt(session['attempt_id'])
-        quiz = self.db_manager.get_quiz_by_id(session['quiz_id'])
+        attempt = await self.db_manager.get_quiz_attempt(session['attempt_id'])
+        quiz = await self.db_manager.get_quiz_by_id(session['quiz_id'])
         
         # Save answers to database
+        answers_data = []
         for question_id, option_id in session['answers'].items():
-            question = self.db_manager.get_question_by_id(question_id)
-            option = self.db_manager.get_question_option_by_id(option_id)
-            
-            answer = Answer(
-                attempt_id=attempt.id,
-                question_id=question_id,
-                selected_option_id=option_id,
-                is_correct=option.is_correct if option else False,
-                points_earned=question.points if (option and option.is_correct) else 0
-            )
+            question = await self.db_manager.get_question_by_id(question_id)
+            option = await self.db_manager.get_question_option_by_id(option_id)
             
-            self.db_manager.add_and_commit(answer)
+            answers_data.append({
+                'attempt_id': attempt.id,
+                'question_id': question_id,
+                'selected_option_id': option_id,
+                'is_correct': option.is_correct if option else False,
+                'points_earned': question.points if (option and option.is_correct) else 0
+            })
+        
+        await self.db_manager.create_answers(answers_data)
         
         # Calculate final score
         attempt.completed_at = datetime.now(timezone.utc)
         attempt.time_taken = int((attempt.completed_at - attempt.started_at).total_seconds())
         attempt.status = 'completed'
         
-        score, max_score, percentage = attempt.calculate_score()
-        self.db_manager.save_changes()
+        score, max_score, percentage = await self.db_manager.calculate_attempt_score(attempt)
+        await self.db_manager.save_changes()
         
         # Clear user session
         del self.user_sessions[db_user.telegram_id]
@@ -489,10 +488,10 @@ Contact an administrator if you encounter any issues."""
         if not session:
             return
         
-        attempt = self.db_manager.get_quiz_attempt(session['attempt_id'])
+        attempt = await self.db_manager.get_quiz_attempt(session['attempt_id'])
         attempt.status = 'expired'
         attempt.completed_at = datetime.now(timezone.utc)
-        self.db_manager.save_changes()
+        await self.db_manager.save_changes()
         
         del self.user_sessions[db_user.telegram_id]
         
@@ -503,7 +502,7 @@ Contact an administrator if you encounter any issues."""
     
     async def get_or_create_user(self, telegram_user) -> User:
         """Get existing user or create new one"""
-        user = self.db_manager.get_user_by_telegram_id(str(telegram_user.id))
+        user = await self.db_manager.get_user_by_telegram_id(str(telegram_user.id))
         
         if not user:
             user = User(
@@ -513,16 +512,35 @@ Contact an administrator if you encounter any issues."""
                 last_name=telegram_user.last_name,
                 is_active=True
             )
-            self.db_manager.add_and_commit(user)
+            await self.db_manager.add_and_commit(user)
         else:
             # Update user info if changed
             user.username = telegram_user.username
             user.first_name = telegram_user.first_name
             user.last_name = telegram_user.last_name
-            self.db_manager.save_changes()
+            if self.db_manager.session.is_modified(user):
+                await self.db_manager.save_changes()
+        
+        # Batched; written by the activity flusher instead of committing per message
+        self.db_manager.update_user_activity(user.id)
         
         return user
     
+    async def start_background_tasks(self, application: Application) -> None:
+        """Start the background task that writes batched user activity"""
+        self._activity_task = asyncio.create_task(self.db_manager.run_activity_flusher())
+    
+    async def stop_background_tasks(self, application: Application) -> None:
+        """Stop background tasks, writing pending activity and sending queued notifications"""
+        if self._activity_task:
+            self._activity_task.cancel()
+            try:
+                await self._activity_task
+            except asyncio.CancelledError:
+                pass
+        
+        await self.email_service.stop_sender()
+    
     async def log_system_event(self, event_type: str, message: str, user_id: Optional[int] = None, metadata: Optional[dict] = None) -> None:
         """Log system events"""
         log_entry = SystemLog(
@@ -531,7 +549,7 @@ Contact an administrator if you encounter any issues."""
             user_id=user_id,
             metadata=metadata
         )
-        self.db_manager.add_and_commit(log_entry)
+        await self.db_manager.add_and_commit(log_entry)
     
     def setup_handlers(self, application: Application) -> None:
         """Setup bot command and message handlers"""
@@ -547,6 +565,13 @@ Contact an administrator if you encounter any issues."""
         
         # Message handlers for text answers
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_text_message))
+        
+        # Runs after the handlers above so each update gets a fresh database session
+        application.add_handler(TypeHandler(Update, self.release_db_session), group=1)
+    
+    async def release_db_session(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Discard the database session used while handling an update"""
+        await self.db_manager.close_session()
     
     async def handle_text_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle text messages (for text-based quiz answers)"""
@@ -561,7 +586,7 @@ Contact an administrator if you encounter any issues."""
             return
         
         # Handle text answer for current question
-        quiz = self.db_manager.get_quiz_by_id(session['quiz_id'])
+        quiz = await self.db_manager.get_quiz_with_questions(session['quiz_id'])
         questions = quiz.questions
         current_question = questions[session['current_question']]
         
@@ -579,7 +604,7 @@ Contact an administrator if you encounter any issues."""
     async def show_question_text(self, update: Update, db_user: User, question_index: int) -> None:
         """Show question via text message"""
         session = self.user_sessions.get(db_user.telegram_id)
-        quiz = self.db_manager.get_quiz_by_id(session['quiz_id'])
+        quiz = await self.db_manager.get_quiz_with_questions(session['quiz_id'])
         questions = quiz.questions
         question = questions[question_index]
         
@@ -613,7 +638,13 @@ def create_bot_application(config: Config) -> Application:
     bot = TelegramQuizBot(config)
     
     # Create application
-    application = Application.builder().token(config.TELEGRAM_BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(config.TELEGRAM_BOT_TOKEN)
+        .post_init(bot.start_background_tasks)
+        .post_shutdown(bot.stop_background_tasks)
+        .build()
+    )
     
     # Setup handlers
     bot.setup_handlers(application)
@@ -9,16 +9,17 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'postgresql://localhost/telegram_quiz_bot'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 20)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
         'pool_pre_ping': True,
-        'pool_recycle': 300,
-        'pool_timeout': 20,
-        'max_overflow': 0
+        'pool_recycle': 1800,
+        'pool_timeout': 20
     }
     
     # Telegram Bot Configuration
     TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
     TELEGRAM_ADMIN_BOT_TOKEN = os.environ.get('TELEGRAM_ADMIN_BOT_TOKEN')
-    ADMIN_CHAT_IDS = [int(x.strip()) for x in os.environ.get('ADMIN_CHAT_IDS', '').split(',') if x.strip()]
+    ADMIN_CHAT_IDS = frozenset(int(x.strip()) for x in os.environ.get('ADMIN_CHAT_IDS', '').split(',') if x.strip())
     
     # Email Configuration
     SMTP_SERVER = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
@@ -27,6 +28,8 @@ class Config:
     SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
     SMTP_USE_TLS = os.environ.get('SMTP_USE_TLS', 'True').lower() == 'true'
     DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL')
+    SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', 5))
+    SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.environ.get('SMTP_MAX_MESSAGES_PER_CONNECTION', 100))
     
     # Redis Configuration
     REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
@@ -47,12 +50,20 @@ class Config:
     # Security
     ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY')
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or SECRET_KEY
+    PBKDF2_ITERATIONS = int(os.environ.get('QTB_PBKDF2_ITERS', 100000))
+    KEY_CACHE_DIR = os.path.expanduser(os.environ.get('KEY_CACHE_DIR', '~/.cache/qtb'))
     
     # Backup Configuration
     BACKUP_INTERVAL_HOURS = int(os.environ.get('BACKUP_INTERVAL_HOURS', 24))
     BACKUP_RETENTION_DAYS = int(os.environ.get('BACKUP_RETENTION_DAYS', 30))
     BACKUP_PATH = os.environ.get('BACKUP_PATH', 'backups')
     
+    # Exports
+    ANALYTICS_PDF_RENDERER = os.environ.get('ANALYTICS_PDF_RENDERER', 'weasyprint')  # weasyprint or reportlab
+    
+    # Templates: compiled dashboard templates are cached here across worker restarts
+    JINJA_CACHE_DIR = os.path.expanduser(os.environ.get('JINJA_CACHE_DIR', '~/.cache/qtb/jinja'))
+    
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE = os.environ.get('LOG_FILE', 'logs/app.log')
@@ -75,6 +86,7 @@ class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     SQLALCHEMY_ECHO = False
+    TEMPLATES_AUTO_RELOAD = False
     
     @classmethod
     def init_app(cls, app):
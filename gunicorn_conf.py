@@ -0,0 +1,22 @@
+"""Gunicorn settings for serving the web dashboard on its own.
+
+Run with: gunicorn -c gunicorn_conf.py web_dashboard:app
+"""
+import multiprocessing
+import os
+
+bind = f"{os.environ.get('FLASK_HOST', '0.0.0.0')}:{os.environ.get('FLASK_PORT', '5000')}"
+
+# Dashboard requests mostly wait on PostgreSQL and Redis, so cooperative workers overlap that latency
+worker_class = 'gevent'
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+timeout = 120
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    """Make psycopg2's C-level socket waits yield to the gevent hub"""
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
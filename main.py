@@ -15,6 +15,8 @@ import time
 from datetime import datetime
 from typing import Optional
 
+import schedule
+
 # Add the project root to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -146,6 +148,19 @@ class TelegramQuizBotApplication:
                 db.init_app(web_app)
                 create_tables()
             
+            self.db_manager.ensure_indexes()
+            self.db_manager.ensure_system_stats_view()
+            
+            # Dashboard statistics are served from the view; the backup scheduler thread runs this job
+            schedule.every(self.db_manager.SYSTEM_STATS_REFRESH_MINUTES).minutes.do(
+                self.db_manager.refresh_system_stats
+            )
+            
+            self.db_manager.ensure_daily_activity()
+            schedule.every(self.db_manager.DAILY_ACTIVITY_REFRESH_MINUTES).minutes.do(
+                self.db_manager.refresh_daily_activity
+            )
+            
             logger.info("Database initialized successfully")
             return True
             
@@ -358,6 +373,10 @@ class TelegramQuizBotApplication:
                 if thread.is_alive():
                     thread.join(timeout=5)
             
+            # Close pooled SMTP connections
+            if self.email_service:
+                self.email_service.close()
+            
             logger.info("Application shutdown completed")
             
         except Exception as e:
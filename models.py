@@ -1,13 +1,20 @@
 from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Float, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Boolean, Date, DateTime, ForeignKey, Float, JSON, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.ext.declarative import declarative_base
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
 
 db = SQLAlchemy()
 
+# Generated search document for users; shared with DatabaseManager for tables created before the column
+USER_SEARCH_TSV_SQL = (
+    "to_tsvector('simple', coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || "
+    "coalesce(username, '') || ' ' || coalesce(email, ''))"
+)
+
 class User(db.Model):
     """Telegram user model"""
     __tablename__ = 'users'
@@ -24,6 +31,14 @@ class User(db.Model):
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     last_activity = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # Only the dashboard's search filter reads it, so it is never loaded with the row
+    search_tsv = deferred(Column(TSVECTOR, Computed(USER_SEARCH_TSV_SQL, persisted=True)))
+    
+    # Serve get_users_by_activity's filter and ordering from the index; search_tsv backs the users search
+    __table_args__ = (
+        Index('ix_users_last_activity', last_activity.desc(), postgresql_where=last_activity.isnot(None)),
+        Index('ix_users_search_tsv', 'search_tsv', postgresql_using='gin'),
+    )
     
     # Relationships
     quiz_attempts = relationship('QuizAttempt', back_populates='user', cascade='all, delete-orphan')
@@ -181,6 +196,15 @@ class QuizAttempt(db.Model):
     time_taken = Column(Integer, nullable=True)  # in seconds
     status = Column(String(20), default='in_progress')  # in_progress, completed, abandoned, expired
     
+    # Recent-attempt windows, per-user/quiz attempt counts, completed-attempt exports and per-user history pages
+    __table_args__ = (
+        Index('ix_quiz_attempts_started_at', started_at.desc()),
+        Index('ix_quiz_attempts_quiz_user', quiz_id, user_id),
+        Index('ix_quiz_attempts_user_status', user_id, status),
+        Index('ix_quiz_attempts_completed_at', completed_at.desc(), postgresql_where=(status == 'completed')),
+        Index('ix_quiz_attempts_user_id_id', user_id, id.desc()),
+    )
+    
     # Relationships
     user = relationship('User', back_populates='quiz_attempts')
     quiz = relationship('Quiz', back_populates='attempts')
@@ -236,6 +260,11 @@ class Answer(db.Model):
     points_earned = Column(Float, default=0.0)
     answered_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     
+    # Per-question answer accuracy, answered from the index alone
+    __table_args__ = (
+        Index('ix_answers_question_id_is_correct', question_id, is_correct),
+    )
+    
     # Relationships
     attempt = relationship('QuizAttempt', back_populates='answers')
     question = relationship('Question', back_populates='answers')
@@ -301,6 +330,11 @@ class SystemLog(db.Model):
     metadata = Column(JSON, nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     
+    # Keyset pagination of the logs page walks (created_at, id) backwards; also serves created_at range scans
+    __table_args__ = (
+        Index('ix_system_logs_created_at_id', created_at.desc(), id.desc()),
+    )
+    
     # Relationships
     user = relationship('User')
     admin_user = relationship('AdminUser')
@@ -317,4 +351,24 @@ class SystemLog(db.Model):
             'admin_user_id': self.admin_user_id,
             'metadata': self.metadata,
             'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+
+class DailyActivity(db.Model):
+    """Per-day attempt rollup maintained by DatabaseManager.refresh_daily_activity"""
+    __tablename__ = 'daily_activity'
+    
+    date = Column(Date, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    unique_users = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DailyActivity {self.date}: {self.attempts}>'
+    
+    def to_dict(self):
+        return {
+            'date': self.date.isoformat() if self.date else None,
+            'attempts': self.attempts,
+            'completed': self.completed,
+            'unique_users': self.unique_users
+        }
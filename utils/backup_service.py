@@ -2,8 +2,17 @@ import logging
 import os
 import shutil
 import subprocess
+import fcntl
 import gzip
+import hashlib
+import heapq
 import json
+import string
+import sys
+import tarfile
+import tempfile
+import zlib
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from pathlib import Path
@@ -20,17 +29,62 @@ logger = logging.getLogger(__name__)
 class BackupService:
     """Service for handling database backups and system maintenance"""
     
+    # Content-defined chunking of deduplicated dumps (1-8 MB chunks)
+    CHUNK_MIN_SIZE = 1 << 20
+    CHUNK_MAX_SIZE = 1 << 23
+    CHUNK_BOUNDARY_MASK = (1 << 15) - 1
+    
+    # gzip levels per backup profile, and candidates tried during calibration
+    COMPRESSION_PROFILES = {'realtime': 1, 'balanced': 6, 'archival': 9}
+    CALIBRATION_LEVELS = (1, 3, 6, 9)
+    CALIBRATION_SAMPLE_SIZE = 4 * 1024 * 1024
+    
+    # Cache lifetimes (seconds) for backup listing and disk usage
+    BACKUP_INDEX_TTL = 10
+    DISK_USAGE_TTL = 5
+    
     def __init__(self, config: Config):
         self.config = config
         self.db_manager = DatabaseManager(config)
         self.email_service = EmailService(config)
         self.backup_dir = Path(config.BACKUP_DIR)
         self.backup_dir.mkdir(parents=True, exist_ok=True)
+        self.pool_dir = self.backup_dir / 'pool'
+        self.chunk_dir = self.backup_dir / 'chunks'
         
         # Backup settings
         self.max_backups = getattr(config, 'MAX_BACKUPS', 30)
         self.backup_schedule = getattr(config, 'BACKUP_SCHEDULE', 'daily')
         self.compress_backups = getattr(config, 'COMPRESS_BACKUPS', True)
+        self.dump_format = getattr(config, 'BACKUP_DUMP_FORMAT', 'custom')  # custom, plain
+        self.dedup_dumps = getattr(config, 'BACKUP_DEDUP', False)
+        self.backup_profile = getattr(config, 'BACKUP_PROFILE', 'balanced')  # realtime, balanced, archival
+        self.min_compress_throughput = getattr(config, 'MIN_COMPRESS_THROUGHPUT', None)  # MB/s
+        self._compression_level = None
+        self._backup_index_cache = None
+        self._disk_usage_cache = None
+        
+        # Notification settings
+        self._admin_emails = tuple(getattr(config, 'ADMIN_EMAILS', ()))
+        self._success_tmpl = string.Template(
+            "Backup completed successfully!\n\n"
+            "Backup Details:\n"
+            "- Name: $name\n"
+            "- Type: $type\n"
+            "- Size: $size_mb MB\n"
+            "- Files: $file_count\n"
+            "- Path: $path\n"
+            "- Created: $created\n\n"
+            "System is running normally.\n"
+        )
+        self._failure_tmpl = string.Template(
+            "Backup failed!\n\n"
+            "Error Details:\n"
+            "- Backup Name: $name\n"
+            "- Error: $error\n"
+            "- Timestamp: $timestamp\n\n"
+            "Please check the system logs and resolve the issue.\n"
+        )
         
         # Initialize backup scheduler
         self._setup_backup_schedule()
@@ -50,16 +104,29 @@ class BackupService:
             logger.error(f"Failed to setup backup schedule: {e}")
     
     def start_backup_scheduler(self):
-        """Start the backup scheduler in a separate thread"""
-        def run_scheduler():
-            while True:
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute
-        
-        scheduler_thread = Thread(target=run_scheduler, daemon=True)
-        scheduler_thread.start()
+        """Start the backup scheduler in a greenlet when gevent has patched threading, otherwise in a separate thread"""
+        if self._gevent_patched():
+            import gevent
+            gevent.spawn(self._run_scheduler)
+        else:
+            scheduler_thread = Thread(target=self._run_scheduler, daemon=True)
+            scheduler_thread.start()
         logger.info("Backup scheduler started")
     
+    @staticmethod
+    def _gevent_patched() -> bool:
+        """Whether gevent's monkey patch is active, whichever way it was applied (GEVENT or a gevent gunicorn worker)"""
+        if 'gevent' not in sys.modules:
+            return False
+        from gevent.monkey import is_module_patched
+        return is_module_patched('threading')
+    
+    def _run_scheduler(self):
+        """Run due scheduled jobs forever"""
+        while True:
+            schedule.run_pending()
+            time.sleep(60)  # Check every minute; cooperative once gevent has patched time
+    
     def create_backup(self, backup_type: str = 'manual') -> Dict[str, Any]:
         """Create a database backup"""
         try:
@@ -98,15 +165,24 @@ class BackupService:
             
             # 4. Compress backup if enabled
             if self.compress_backups:
-                compressed_file = self._compress_backup(backup_path)
-                if compressed_file:
-                    # Remove uncompressed directory
-                    shutil.rmtree(backup_path)
-                    result['backup_path'] = str(compressed_file)
+                if db_backup_file and self._is_precompressed_dump(db_backup_file):
+                    # Custom-format dumps are already compressed, only pack the small JSON files
+                    metadata_archive = self._compress_metadata_files(
+                        backup_path, [config_backup_file, metadata_file]
+                    )
+                    if metadata_archive:
+                        result['files'] = [db_backup_file, str(metadata_archive)]
                     result['compressed'] = True
+                else:
+                    compressed_file = self._compress_backup(backup_path)
+                    if compressed_file:
+                        # Remove uncompressed directory
+                        shutil.rmtree(backup_path)
+                        result['backup_path'] = str(compressed_file)
+                        result['compressed'] = True
             
             # Calculate total size
-            if self.compress_backups and 'compressed' in result:
+            if os.path.isfile(result['backup_path']):
                 result['size'] = os.path.getsize(result['backup_path'])
             else:
                 result['size'] = self._calculate_directory_size(backup_path)
@@ -145,8 +221,6 @@ class BackupService:
     def _create_database_dump(self, backup_path: Path, timestamp: str) -> Optional[str]:
         """Create PostgreSQL database dump"""
         try:
-            dump_file = backup_path / f"database_dump_{timestamp}.sql"
-            
             # Build pg_dump command
             cmd = [
                 'pg_dump',
@@ -155,23 +229,36 @@ class BackupService:
                 '--username', self.config.DB_USER,
                 '--dbname', self.config.DB_NAME,
                 '--no-password',
-                '--verbose',
                 '--clean',
                 '--if-exists',
-                '--create',
-                '--file', str(dump_file)
+                '--create'
             ]
             
             # Set environment variable for password
             env = os.environ.copy()
             env['PGPASSWORD'] = self.config.DB_PASSWORD
             
+            if self.dedup_dumps:
+                # Plain SQL output chunks well, custom format is already compressed
+                return self._create_chunked_dump(cmd + ['--format', 'plain'], env, backup_path, timestamp)
+            
+            if self.dump_format == 'custom':
+                # Custom format is compressed by pg_dump itself
+                dump_file = backup_path / f"database_dump_{timestamp}.pgdump"
+            else:
+                dump_file = backup_path / f"database_dump_{timestamp}.sql"
+            
+            cmd += [
+                '--format', 'custom' if self.dump_format == 'custom' else 'plain',
+                '--file', str(dump_file)
+            ]
+            
             # Execute pg_dump
             result = subprocess.run(
                 cmd,
                 env=env,
-                capture_output=True,
-                text=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
                 timeout=300  # 5 minutes timeout
             )
             
@@ -179,7 +266,7 @@ class BackupService:
                 logger.info(f"Database dump created: {dump_file}")
                 return str(dump_file)
             else:
-                logger.error(f"pg_dump failed: {result.stderr}")
+                logger.error(f"pg_dump failed: {result.stderr.decode('utf-8', 'replace')}")
                 return None
                 
         except subprocess.TimeoutExpired:
@@ -189,6 +276,125 @@ class BackupService:
             logger.error(f"Failed to create database dump: {e}")
             return None
     
+    def _create_chunked_dump(self, cmd: List[str], env: Dict[str, str], backup_path: Path, timestamp: str) -> Optional[str]:
+        """Stream pg_dump output into deduplicated chunks and write a manifest"""
+        manifest_file = backup_path / f"database_dump_{timestamp}.manifest.json"
+        
+        # Chunks stay unreferenced until the manifest is written, so keep cleanup out until then
+        with self._chunk_store_lock():
+            return self._write_chunked_dump(cmd, env, manifest_file)
+    
+    def _write_chunked_dump(self, cmd: List[str], env: Dict[str, str], manifest_file: Path) -> Optional[str]:
+        """Run pg_dump into the chunk pool and write the manifest listing its chunks"""
+        chunks = []
+        total_size = 0
+        
+        with tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=stderr_file)
+            try:
+                for chunk in self._iter_dump_chunks(process.stdout):
+                    chunks.append(self._store_chunk(chunk))
+                    total_size += len(chunk)
+                returncode = process.wait(timeout=300)
+            except Exception:
+                process.kill()
+                process.wait()
+                raise
+            finally:
+                process.stdout.close()
+            
+            if returncode != 0:
+                stderr_file.seek(0)
+                logger.error(f"pg_dump failed: {stderr_file.read().decode('utf-8', 'replace')}")
+                return None
+        
+        manifest = {
+            'format': 'plain',
+            'hash': 'sha256',
+            'compression': 'gzip',
+            'size': total_size,
+            'chunks': chunks
+        }
+        with open(manifest_file, 'w') as f:
+            json.dump(manifest, f)
+        
+        logger.info(f"Deduplicated database dump created: {manifest_file} ({len(chunks)} chunks)")
+        return str(manifest_file)
+    
+    def _iter_dump_chunks(self, stream):
+        """Split a dump stream into content-defined chunks on line boundaries"""
+        lines = []
+        size = 0
+        for line in stream:
+            lines.append(line)
+            size += len(line)
+            if size >= self.CHUNK_MAX_SIZE or (
+                size >= self.CHUNK_MIN_SIZE and zlib.crc32(line) & self.CHUNK_BOUNDARY_MASK == 0
+            ):
+                yield b''.join(lines)
+                lines = []
+                size = 0
+        if lines:
+            yield b''.join(lines)
+    
+    def _store_chunk(self, chunk: bytes) -> str:
+        """Store a dump chunk in the chunk pool unless it already exists"""
+        digest = hashlib.sha256(chunk).hexdigest()
+        chunk_path = self.chunk_dir / digest[:2] / digest
+        
+        if not chunk_path.exists():
+            chunk_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = chunk_path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(gzip.compress(chunk, compresslevel=self.compression_level))
+            os.replace(tmp_path, chunk_path)
+        
+        return digest
+    
+    @contextmanager
+    def _chunk_store_lock(self, exclusive: bool = False):
+        """Hold the chunk/file pool lock: shared while a backup writes into a pool, exclusive (non-blocking) while pruning"""
+        self.chunk_dir.mkdir(parents=True, exist_ok=True)
+        # flock also excludes backups running in other processes, such as the dashboard's manual backups
+        with open(self.chunk_dir / '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _cleanup_chunks(self):
+        """Remove dump chunks no longer referenced by any backup manifest"""
+        if not self.chunk_dir.exists():
+            return
+        
+        try:
+            with self._chunk_store_lock(exclusive=True):
+                self._prune_chunks()
+        except BlockingIOError:
+            # A backup is writing chunks its manifest does not list yet; the next cleanup prunes instead
+            logger.info("Skipping dump chunk cleanup while a backup is in progress")
+    
+    def _prune_chunks(self):
+        """Delete chunk files missing from every manifest; the caller holds the exclusive chunk lock"""
+        referenced = set()
+        for entry in self._iter_backup_entries():
+            if not entry.is_dir():
+                continue
+            for manifest_file in Path(entry.path).glob('*.manifest.json'):
+                with open(manifest_file) as f:
+                    referenced.update(json.load(f)['chunks'])
+        
+        for bucket in self.chunk_dir.iterdir():
+            if not bucket.is_dir():
+                continue
+            for chunk_file in bucket.iterdir():
+                if chunk_file.name not in referenced:
+                    try:
+                        chunk_file.unlink()
+                    except OSError as e:
+                        logger.error(f"Failed to remove dump chunk {chunk_file.name}: {e}")
+    
     def _backup_configuration(self, backup_path: Path) -> Optional[str]:
         """Backup configuration files"""
         try:
@@ -203,7 +409,8 @@ class BackupService:
                 'backup_settings': {
                     'max_backups': self.max_backups,
                     'backup_schedule': self.backup_schedule,
-                    'compress_backups': self.compress_backups
+                    'compress_backups': self.compress_backups,
+                    'backup_profile': self.backup_profile
                 },
                 'quiz_settings': {
                     'default_time_limit': getattr(self.config, 'DEFAULT_QUIZ_TIME_LIMIT', None),
@@ -212,8 +419,10 @@ class BackupService:
                 }
             }
             
-            with open(config_file, 'w') as f:
-                json.dump(config_data, f, indent=2, default=str)
+            self._write_pooled_file(
+                config_file,
+                json.dumps(config_data, indent=2, default=str).encode('utf-8')
+            )
             
             logger.info(f"Configuration backup created: {config_file}")
             return str(config_file)
@@ -246,8 +455,8 @@ class BackupService:
                 }
             }
             
-            with open(metadata_file, 'w') as f:
-                json.dump(metadata, f, indent=2, default=str)
+            # Timestamp and live stats make every metadata file unique, so it is never pooled
+            metadata_file.write_text(json.dumps(metadata, indent=2, default=str), encoding='utf-8')
             
             logger.info(f"Backup metadata created: {metadata_file}")
             return str(metadata_file)
@@ -256,18 +465,124 @@ class BackupService:
             logger.error(f"Failed to create backup metadata: {e}")
             return None
     
+    def _write_pooled_file(self, dest: Path, content: bytes):
+        """Write content to a content-addressed pool file and hardlink it to dest"""
+        if self.compress_backups:
+            # Compressed backups archive and delete their JSON files, so a pool link would never outlive the backup
+            dest.write_bytes(content)
+            return
+        
+        digest = hashlib.sha256(content).hexdigest()
+        pool_path = self.pool_dir / digest[:2] / digest
+        
+        # Pool cleanup shares the chunk pool lock; it must not remove pool_path before it is linked
+        with self._chunk_store_lock():
+            if not pool_path.exists():
+                pool_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = pool_path.with_suffix('.tmp')
+                with open(tmp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, pool_path)
+            
+            try:
+                os.link(pool_path, dest)
+            except OSError:
+                # Filesystem without hardlink support, fall back to a plain copy
+                shutil.copyfile(pool_path, dest)
+    
+    def _cleanup_pool(self):
+        """Remove pool files no longer referenced by any backup"""
+        if not self.pool_dir.exists():
+            return
+        
+        try:
+            with self._chunk_store_lock(exclusive=True):
+                self._prune_pool()
+        except BlockingIOError:
+            logger.info("Skipping backup pool cleanup while a backup is in progress")
+    
+    def _prune_pool(self):
+        """Delete pool files no backup links to anymore; the caller holds the exclusive chunk lock"""
+        for bucket in self.pool_dir.iterdir():
+            if not bucket.is_dir():
+                continue
+            for pool_file in bucket.iterdir():
+                try:
+                    if pool_file.stat().st_nlink <= 1:
+                        pool_file.unlink()
+                except OSError as e:
+                    logger.error(f"Failed to remove pool file {pool_file.name}: {e}")
+    
+    def _is_precompressed_dump(self, dump_file: str) -> bool:
+        """Check whether a dump file is already compressed by pg_dump"""
+        return dump_file.endswith(('.pgdump', '.manifest.json'))
+    
+    def _compress_metadata_files(self, backup_path: Path, files: List[Optional[str]]) -> Optional[Path]:
+        """Pack the small JSON files of a backup into a single archive"""
+        try:
+            files = [Path(f) for f in files if f]
+            if not files:
+                return None
+            
+            archive_file = backup_path / "metadata.tar.gz"
+            with tarfile.open(archive_file, 'w:gz', compresslevel=self.compression_level) as tar:
+                for file_path in files:
+                    tar.add(str(file_path), arcname=file_path.name)
+            
+            for file_path in files:
+                file_path.unlink()
+            
+            logger.info(f"Backup metadata compressed: {archive_file}")
+            return archive_file
+            
+        except Exception as e:
+            logger.error(f"Failed to compress backup metadata: {e}")
+            return None
+    
+    @property
+    def compression_level(self) -> int:
+        """gzip level used for backup archives, selected on first use"""
+        if self._compression_level is None:
+            self._compression_level = self._select_compression_level()
+            logger.info(f"Backup compression level set to: {self._compression_level}")
+        return self._compression_level
+    
+    def _select_compression_level(self) -> int:
+        """Pick the highest level allowed by the profile that meets the throughput target"""
+        max_level = self.COMPRESSION_PROFILES.get(self.backup_profile, self.COMPRESSION_PROFILES['balanced'])
+        if not self.min_compress_throughput:
+            return max_level
+        
+        # Fixed, dump-like sample so results are comparable between runs
+        sample = b''.join(
+            f"{i}\tuser_{i % 997}\t{(i * 7919) % 100003}\t2024-01-01 00:00:00\n".encode()
+            for i in range(self.CALIBRATION_SAMPLE_SIZE // 40)
+        )[:self.CALIBRATION_SAMPLE_SIZE]
+        
+        selected = self.CALIBRATION_LEVELS[0]
+        for level in self.CALIBRATION_LEVELS:
+            if level > max_level:
+                break
+            
+            start = time.perf_counter()
+            gzip.compress(sample, compresslevel=level)
+            elapsed = max(time.perf_counter() - start, 1e-6)
+            
+            throughput = len(sample) / (1024 * 1024) / elapsed
+            if throughput < self.min_compress_throughput:
+                break
+            selected = level
+        
+        return selected
+    
     def _compress_backup(self, backup_path: Path) -> Optional[Path]:
         """Compress backup directory"""
         try:
             compressed_file = backup_path.with_suffix('.tar.gz')
             
             # Create tar.gz archive
-            shutil.make_archive(
-                str(backup_path),
-                'gztar',
-                str(backup_path.parent),
-                str(backup_path.name)
-            )
+            with tarfile.open(compressed_file, 'w:gz', compresslevel=self.compression_level) as tar:
+                tar.add(str(backup_path), arcname=backup_path.name)
             
             logger.info(f"Backup compressed: {compressed_file}")
             return compressed_file
@@ -276,34 +591,42 @@ class BackupService:
             logger.error(f"Failed to compress backup: {e}")
             return None
     
-    def _calculate_directory_size(self, path: Path) -> int:
+    def _calculate_directory_size(self, path) -> int:
         """Calculate total size of directory"""
         total_size = 0
-        for dirpath, dirnames, filenames in os.walk(path):
-            for filename in filenames:
-                file_path = os.path.join(dirpath, filename)
-                total_size += os.path.getsize(file_path)
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    total_size += self._calculate_directory_size(entry.path)
+                else:
+                    total_size += entry.stat(follow_symlinks=False).st_size
         return total_size
     
+    def _iter_backup_entries(self):
+        """Yield directory entries for backups in the backup directory"""
+        with os.scandir(self.backup_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith('quiz_bot_backup_'):
+                    yield entry
+    
     def _cleanup_old_backups(self):
         """Remove old backups beyond the retention limit"""
         try:
             # Get all backup files/directories
             backups = []
             
-            for item in self.backup_dir.iterdir():
-                if item.name.startswith('quiz_bot_backup_'):
-                    backups.append({
-                        'path': item,
-                        'created': item.stat().st_ctime
-                    })
+            for entry in self._iter_backup_entries():
+                backups.append({
+                    'path': Path(entry.path),
+                    'created': entry.stat().st_ctime
+                })
             
-            # Sort by creation time (newest first)
-            backups.sort(key=lambda x: x['created'], reverse=True)
+            # Only the oldest backups beyond the retention limit are needed
+            excess = len(backups) - self.max_backups
             
             # Remove old backups
-            if len(backups) > self.max_backups:
-                for backup in backups[self.max_backups:]:
+            if excess > 0:
+                for backup in heapq.nsmallest(excess, backups, key=lambda x: x['created']):
                     try:
                         if backup['path'].is_file():
                             backup['path'].unlink()
@@ -314,6 +637,11 @@ class BackupService:
                     except Exception as e:
                         logger.error(f"Failed to remove old backup {backup['path'].name}: {e}")
             
+            # Drop pooled files and dump chunks that no backup references anymore
+            self._cleanup_pool()
+            self._cleanup_chunks()
+            self._invalidate_backup_cache()
+            
         except Exception as e:
             logger.error(f"Failed to cleanup old backups: {e}")
     
@@ -340,78 +668,87 @@ class BackupService:
     
     def _send_backup_notification(self, backup_result: Dict[str, Any], success: bool):
         """Send backup notification email"""
+        if not self._admin_emails:
+            return
+        
         try:
             if success:
                 subject = f"✅ Backup Successful - {backup_result['backup_name']}"
-                
-                body = f"""
-                Backup completed successfully!
-                
-                Backup Details:
-                - Name: {backup_result['backup_name']}
-                - Type: {backup_result['type']}
-                - Size: {backup_result['size'] / (1024*1024):.2f} MB
-                - Files: {len(backup_result['files'])}
-                - Path: {backup_result['backup_path']}
-                - Created: {backup_result['timestamp']}
-                
-                System is running normally.
-                """
+                body = self._success_tmpl.substitute(
+                    name=backup_result['backup_name'],
+                    type=backup_result['type'],
+                    size_mb=f"{backup_result['size'] / (1024*1024):.2f}",
+                    file_count=len(backup_result['files']),
+                    path=backup_result['backup_path'],
+                    created=backup_result['timestamp']
+                )
             else:
                 subject = f"❌ Backup Failed - {backup_result['backup_name']}"
-                
-                body = f"""
-                Backup failed!
-                
-                Error Details:
-                - Backup Name: {backup_result['backup_name']}
-                - Error: {backup_result.get('error', 'Unknown error')}
-                - Timestamp: {datetime.now().isoformat()}
-                
-                Please check the system logs and resolve the issue.
-                """
+                body = self._failure_tmpl.substitute(
+                    name=backup_result['backup_name'],
+                    error=backup_result.get('error', 'Unknown error'),
+                    timestamp=datetime.now().isoformat()
+                )
             
             # Send to admin emails
-            admin_emails = getattr(self.config, 'ADMIN_EMAILS', [])
-            if admin_emails:
-                self.email_service.send_email(
-                    to_emails=admin_emails,
-                    subject=subject,
-                    body=body
-                )
+            self.email_service.send_email(
+                to_emails=list(self._admin_emails),
+                subject=subject,
+                body=body
+            )
                 
         except Exception as e:
             logger.error(f"Failed to send backup notification: {e}")
     
+    def _invalidate_backup_cache(self):
+        """Drop cached backup listing and disk usage"""
+        self._backup_index_cache = None
+        self._disk_usage_cache = None
+    
+    def _get_disk_usage(self):
+        """Get disk usage of the backup directory, cached for a few seconds"""
+        now = time.monotonic()
+        if self._disk_usage_cache is None or self._disk_usage_cache[0] <= now:
+            self._disk_usage_cache = (now + self.DISK_USAGE_TTL, shutil.disk_usage(self.backup_dir))
+        return self._disk_usage_cache[1]
+    
     def list_backups(self) -> List[Dict[str, Any]]:
         """List all available backups"""
+        if self._backup_index_cache is not None and self._backup_index_cache[0] > time.monotonic():
+            return list(self._backup_index_cache[1])
+        
         try:
             backups = []
             
-            for item in self.backup_dir.iterdir():
-                if item.name.startswith('quiz_bot_backup_'):
-                    stat = item.stat()
-                    
-                    backup_info = {
-                        'name': item.name,
-                        'path': str(item),
-                        'size': stat.st_size,
-                        'created': datetime.fromtimestamp(stat.st_ctime),
-                        'modified': datetime.fromtimestamp(stat.st_mtime),
-                        'is_compressed': item.suffix == '.gz'
-                    }
-                    
-                    # Try to extract backup type from name
-                    name_parts = item.name.split('_')
-                    if len(name_parts) >= 4:
-                        backup_info['type'] = name_parts[3]
-                    
-                    backups.append(backup_info)
+            for entry in self._iter_backup_entries():
+                stat = entry.stat(follow_symlinks=False)
+                
+                if entry.is_dir(follow_symlinks=False):
+                    size = self._calculate_directory_size(entry.path)
+                else:
+                    size = stat.st_size
+                
+                backup_info = {
+                    'name': entry.name,
+                    'path': entry.path,
+                    'size': size,
+                    'created': datetime.fromtimestamp(stat.st_ctime),
+                    'modified': datetime.fromtimestamp(stat.st_mtime),
+                    'is_compressed': entry.name.endswith('.gz')
+                }
+                
+                # Try to extract backup type from name
+                name_parts = entry.name.split('_')
+                if len(name_parts) >= 4:
+                    backup_info['type'] = name_parts[3]
+                
+                backups.append(backup_info)
             
             # Sort by creation time (newest first)
             backups.sort(key=lambda x: x['created'], reverse=True)
             
-            return backups
+            self._backup_index_cache = (time.monotonic() + self.BACKUP_INDEX_TTL, backups)
+            return list(backups)
             
         except Exception as e:
             logger.error(f"Failed to list backups: {e}")
@@ -447,6 +784,9 @@ class BackupService:
             else:
                 shutil.rmtree(backup_path)
             
+            self._cleanup_chunks()
+            self._invalidate_backup_cache()
+            
             logger.info(f"Backup deleted: {backup_name}")
             
             return {
@@ -474,7 +814,7 @@ class BackupService:
             last_backup = backups[0] if backups else None
             
             # Check disk space
-            disk_usage = shutil.disk_usage(self.backup_dir)
+            disk_usage = self._get_disk_usage()
             
             status = {
                 'backup_count': len(backups),
@@ -495,6 +835,7 @@ class BackupService:
                     'max_backups': self.max_backups,
                     'schedule': self.backup_schedule,
                     'compress': self.compress_backups,
+                    'profile': self.backup_profile,
                     'backup_dir': str(self.backup_dir)
                 }
             }
@@ -1,13 +1,24 @@
+import asyncio
+import atexit
 import logging
+import threading
+from collections import deque
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
-from sqlalchemy import create_engine, func, desc, and_, or_
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, func, desc, and_, or_, case, select, insert, update, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import sessionmaker, scoped_session, Session, selectinload
 from sqlalchemy.exc import SQLAlchemyError
 import os
+import json
+import re
 import subprocess
+import time
 
-from models import db, User, Quiz, Question, QuestionOption, QuizAttempt, Answer, SystemLog, AdminUser
+import redis
+
+from models import db, User, Quiz, Question, QuestionOption, QuizAttempt, Answer, SystemLog, AdminUser, DailyActivity, USER_SEARCH_TSV_SQL
 from config import Config
 
 logger = logging.getLogger(__name__)
@@ -15,27 +26,177 @@ logger = logging.getLogger(__name__)
 class DatabaseManager:
     """Database operations manager"""
     
+    # Connection pool and statement cache defaults, overridable through SQLALCHEMY_ENGINE_OPTIONS
+    DEFAULT_ENGINE_OPTIONS = {
+        'pool_size': 20,
+        'max_overflow': 20,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+        'query_cache_size': 1200
+    }
+    
+    # Seconds to reuse the (expensive) database size query result
+    DB_SIZE_CACHE_TTL = 60
+    
+    # Seconds system/quiz analytics stay cached in Redis, or in-process while Redis is down
+    ANALYTICS_CACHE_TTL = 60
+    ANALYTICS_CACHE_PREFIX = 'quizbot:analytics:'
+    
+    # Seconds per time slice in which analytics are reused in-process without asking Redis
+    ANALYTICS_LOCAL_WINDOW = 10
+    
+    # Columns of the mv_system_stats materialized view, matching get_system_stats keys
+    SYSTEM_STATS_FIELDS = (
+        'total_users', 'active_users', 'new_users_week', 'new_users_month',
+        'total_quizzes', 'active_quizzes', 'total_questions',
+        'total_attempts', 'completed_attempts', 'attempts_today', 'attempts_week',
+        'average_score', 'pass_rate', 'most_popular_quiz'
+    )
+    
+    # Minutes between mv_system_stats refreshes
+    SYSTEM_STATS_REFRESH_MINUTES = 5
+    
+    SYSTEM_STATS_VIEW_SQL = """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS mv_system_stats AS
+        SELECT
+            1 AS id,
+            u.total_users, u.active_users, u.new_users_week, u.new_users_month,
+            q.total_quizzes, q.active_quizzes,
+            (SELECT count(*) FROM questions) AS total_questions,
+            a.total_attempts, a.completed_attempts, a.attempts_today, a.attempts_week,
+            a.average_score,
+            a.passed_attempts * 100.0 / GREATEST(a.completed_attempts, 1) AS pass_rate,
+            (SELECT quizzes.title FROM quizzes JOIN quiz_attempts ON quiz_attempts.quiz_id = quizzes.id
+             GROUP BY quizzes.id, quizzes.title ORDER BY count(quiz_attempts.id) DESC LIMIT 1) AS most_popular_quiz
+        FROM
+            (SELECT count(*) AS total_users,
+                    count(*) FILTER (WHERE is_active) AS active_users,
+                    count(*) FILTER (WHERE created_at >= now() - interval '7 days') AS new_users_week,
+                    count(*) FILTER (WHERE created_at >= now() - interval '30 days') AS new_users_month
+             FROM users) u,
+            (SELECT count(*) AS total_quizzes,
+                    count(*) FILTER (WHERE is_active) AS active_quizzes
+             FROM quizzes) q,
+            (SELECT count(*) AS total_attempts,
+                    count(*) FILTER (WHERE status = 'completed') AS completed_attempts,
+                    count(*) FILTER (WHERE started_at >= date_trunc('day', now())) AS attempts_today,
+                    count(*) FILTER (WHERE started_at >= now() - interval '7 days') AS attempts_week,
+                    avg(percentage) FILTER (WHERE status = 'completed' AND percentage IS NOT NULL) AS average_score,
+                    count(*) FILTER (WHERE is_passed) AS passed_attempts
+             FROM quiz_attempts) a
+    """
+    
+    # Minutes between daily_activity rollup refreshes, and how many trailing days each refresh recomputes
+    DAILY_ACTIVITY_REFRESH_MINUTES = 5
+    DAILY_ACTIVITY_REFRESH_DAYS = 2
+    
+    DAILY_ACTIVITY_UPSERT_SQL = """
+        INSERT INTO daily_activity (date, attempts, completed, unique_users)
+        SELECT date_trunc('day', started_at)::date,
+               count(*),
+               count(*) FILTER (WHERE status = 'completed'),
+               count(DISTINCT user_id)
+        FROM quiz_attempts
+        WHERE started_at >= :since
+        GROUP BY 1
+        ON CONFLICT (date) DO UPDATE SET
+            attempts = EXCLUDED.attempts,
+            completed = EXCLUDED.completed,
+            unique_users = EXCLUDED.unique_users
+    """
+    
+    # Seconds between batched system log inserts, queue length that triggers an early flush,
+    # and the most entries held each by the queue and the failed-flush retry buffer (oldest are dropped beyond it)
+    LOG_FLUSH_INTERVAL = 0.5
+    LOG_FLUSH_BATCH = 100
+    LOG_BUFFER_SIZE = 10000
+    
+    # Columns declared on the models, added to tables that predate them
+    COLUMN_STATEMENTS = (
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS search_tsv tsvector "
+        f"GENERATED ALWAYS AS ({USER_SEARCH_TSV_SQL}) STORED",
+    )
+    
+    # Picks the index name out of an INDEX_STATEMENTS CREATE, to check the index is valid first
+    _CREATE_INDEX_RE = re.compile(r'CREATE (?:UNIQUE )?INDEX CONCURRENTLY IF NOT EXISTS (\w+)')
+    
+    # Indexes declared on the models, created on tables that predate them, and superseded ones dropped
+    INDEX_STATEMENTS = (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_quiz_attempts_started_at "
+        "ON quiz_attempts (started_at DESC)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_quiz_attempts_quiz_user "
+        "ON quiz_attempts (quiz_id, user_id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_last_activity "
+        "ON users (last_activity DESC) WHERE last_activity IS NOT NULL",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_quiz_attempts_user_status "
+        "ON quiz_attempts (user_id, status)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_quiz_attempts_completed_at "
+        "ON quiz_attempts (completed_at DESC) WHERE status = 'completed'",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_answers_question_id_is_correct "
+        "ON answers (question_id, is_correct)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_system_logs_created_at_id "
+        "ON system_logs (created_at DESC, id DESC)",
+        # Superseded by ix_system_logs_created_at_id, which serves the same range scans
+        "DROP INDEX CONCURRENTLY IF EXISTS ix_system_logs_created_at",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_quiz_attempts_user_id_id "
+        "ON quiz_attempts (user_id, id DESC)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_search_tsv "
+        "ON users USING gin (search_tsv)"
+    )
+    
     def __init__(self, config: Config):
         self.config = config
         self.engine = create_engine(
             config.SQLALCHEMY_DATABASE_URI,
-            **config.SQLALCHEMY_ENGINE_OPTIONS
+            **{**self.DEFAULT_ENGINE_OPTIONS, **config.SQLALCHEMY_ENGINE_OPTIONS}
         )
-        self.SessionLocal = sessionmaker(bind=self.engine)
-        self._session = None
+        self.SessionLocal = sessionmaker(bind=self.engine, expire_on_commit=False)
+        # One session per thread; callers release it with close_session() when a request ends
+        self.Session = scoped_session(self.SessionLocal)
+        self._db_size_cache = None
+        # Shared analytics cache; connects lazily and is skipped when Redis is unreachable
+        self._analytics_cache = redis.from_url(
+            getattr(config, 'REDIS_URL', 'redis://localhost:6379/0'),
+            socket_connect_timeout=1,
+            socket_timeout=1
+        )
+        # key -> (expires_at, result), consulted only when Redis cannot be reached
+        self._local_analytics: Dict[str, tuple] = {}
+        # key -> (time slice, result), shared by all requests of this process within one slice
+        self._windowed_analytics: Dict[str, tuple] = {}
+        # System log rows waiting for the background flusher
+        self._pending_logs = deque(maxlen=self.LOG_BUFFER_SIZE)
+        # Entries whose flush failed, retried first; kept apart so a full queue drops its oldest entries, not its newest
+        self._retry_logs = deque(maxlen=self.LOG_BUFFER_SIZE)
+        self._log_flush_lock = threading.Lock()
+        self._log_flush_wakeup = threading.Event()
+        self._log_flusher_lock = threading.Lock()
+        self._log_flusher: Optional[threading.Thread] = None
     
     @property
     def session(self) -> Session:
-        """Get current database session"""
-        if self._session is None:
-            self._session = self.SessionLocal()
-        return self._session
+        """Get the database session for the current thread"""
+        return self.Session()
     
     def close_session(self):
-        """Close current database session"""
-        if self._session:
-            self._session.close()
-            self._session = None
+        """Close and discard the current thread's database session"""
+        self.Session.remove()
+    
+    @property
+    def _lookup_cache(self) -> Dict[tuple, Any]:
+        """Lookup memo stored on the current session, so it dies with it"""
+        return self.session.info.setdefault('lookup_cache', {})
+    
+    def _cached_lookup(self, key: tuple, loader):
+        """Memoize a single-entity lookup for the lifetime of the current session"""
+        cache = self._lookup_cache
+        if key in cache:
+            return cache[key]
+        
+        result = loader()
+        if result is not None:
+            cache[key] = result
+        return result
     
     def save_changes(self):
         """Commit current session changes"""
@@ -60,18 +221,76 @@ class DatabaseManager:
     # User operations
     def get_user_by_telegram_id(self, telegram_id: str) -> Optional[User]:
         """Get user by Telegram ID"""
-        return self.session.query(User).filter(User.telegram_id == telegram_id).first()
+        return self._cached_lookup(
+            ('user_telegram_id', telegram_id),
+            lambda: self.session.query(User).filter(User.telegram_id == telegram_id).first()
+        )
     
     def get_user_by_id(self, user_id: int) -> Optional[User]:
         """Get user by ID"""
-        return self.session.query(User).filter(User.id == user_id).first()
+        return self._cached_lookup(
+            ('user', user_id),
+            lambda: self.session.query(User).filter(User.id == user_id).first()
+        )
     
-    def get_all_users(self, active_only: bool = False) -> List[User]:
+    def get_user_status(self, user_id: int):
+        """Get only a user's id, username, first name and active flag, as a row"""
+        return self.session.query(User).with_entities(
+            User.id, User.username, User.first_name, User.is_active
+        ).filter(User.id == user_id).first()
+    
+    def get_user_version(self, user_id: int):
+        """Get (updated_at, newest attempt id, completed attempts) for a user in one query, None if missing"""
+        return self.session.query(
+            User.updated_at,
+            func.max(QuizAttempt.id),
+            func.count(QuizAttempt.id).filter(QuizAttempt.status == 'completed')
+        ).outerjoin(QuizAttempt, QuizAttempt.user_id == User.id).filter(
+            User.id == user_id
+        ).group_by(User.id).first()
+    
+    def _paginate(self, query, limit: Optional[int], offset: int):
+        """Apply limit/offset to a query, limit=None returns everything"""
+        if limit is not None:
+            query = query.limit(limit)
+        if offset:
+            query = query.offset(offset)
+        return query
+    
+    def get_all_users(self, active_only: bool = False, limit: Optional[int] = 50, offset: int = 0) -> List[User]:
         """Get all users"""
         query = self.session.query(User)
         if active_only:
             query = query.filter(User.is_active == True)
-        return query.order_by(User.created_at.desc()).all()
+        return self._paginate(query.order_by(User.created_at.desc()), limit, offset).all()
+    
+    def get_users_list(self, active_only: bool = False, limit: Optional[int] = 50, offset: int = 0) -> List[Any]:
+        """Get lightweight user rows for list views, including attempt counts"""
+        attempt_count = self.session.query(func.count(QuizAttempt.id)).filter(
+            QuizAttempt.user_id == User.id
+        ).correlate(User).scalar_subquery()
+        
+        query = self.session.query(
+            User.id,
+            User.telegram_id,
+            User.username,
+            User.first_name,
+            User.last_name,
+            User.is_active,
+            User.is_admin,
+            User.last_activity,
+            attempt_count.label('attempt_count')
+        )
+        if active_only:
+            query = query.filter(User.is_active == True)
+        return self._paginate(query.order_by(User.created_at.desc()), limit, offset).all()
+    
+    def count_users(self, active_only: bool = False) -> int:
+        """Get number of users"""
+        query = self.session.query(func.count(User.id))
+        if active_only:
+            query = query.filter(User.is_active == True)
+        return query.scalar()
     
     def get_users_by_activity(self, days: int = 30) -> List[User]:
         """Get users active within specified days"""
@@ -90,7 +309,26 @@ class DatabaseManager:
     # Quiz operations
     def get_quiz_by_id(self, quiz_id: int) -> Optional[Quiz]:
         """Get quiz by ID"""
-        return self.session.query(Quiz).filter(Quiz.id == quiz_id).first()
+        return self._cached_lookup(
+            ('quiz', quiz_id),
+            lambda: self.session.query(Quiz).filter(Quiz.id == quiz_id).first()
+        )
+    
+    def get_quiz_status(self, quiz_id: int):
+        """Get only a quiz's id, title and active flag, as a row"""
+        return self.session.query(Quiz).with_entities(
+            Quiz.id, Quiz.title, Quiz.is_active
+        ).filter(Quiz.id == quiz_id).first()
+    
+    def get_quiz_version(self, quiz_id: int):
+        """Get (updated_at, newest attempt id, completed attempts) for a quiz in one query, None if missing"""
+        return self.session.query(
+            Quiz.updated_at,
+            func.max(QuizAttempt.id),
+            func.count(QuizAttempt.id).filter(QuizAttempt.status == 'completed')
+        ).outerjoin(QuizAttempt, QuizAttempt.quiz_id == Quiz.id).filter(
+            Quiz.id == quiz_id
+        ).group_by(Quiz.id).first()
     
     def get_active_quizzes(self) -> List[Quiz]:
         """Get all active quizzes"""
@@ -98,13 +336,35 @@ class DatabaseManager:
             Quiz.is_active == True
         ).order_by(Quiz.created_at.desc()).all()
     
-    def get_all_quizzes(self) -> List[Quiz]:
+    def get_all_quizzes(self, limit: Optional[int] = 50, offset: int = 0) -> List[Quiz]:
         """Get all quizzes"""
-        return self.session.query(Quiz).order_by(Quiz.created_at.desc()).all()
+        query = self.session.query(Quiz).order_by(Quiz.created_at.desc())
+        return self._paginate(query, limit, offset).all()
+    
+    def get_quizzes_list(self, limit: Optional[int] = 50, offset: int = 0) -> List[Any]:
+        """Get lightweight quiz rows for list views, including question and attempt counts"""
+        question_count = self.session.query(func.count(Question.id)).filter(
+            Question.quiz_id == Quiz.id
+        ).correlate(Quiz).scalar_subquery()
+        attempt_count = self.session.query(func.count(QuizAttempt.id)).filter(
+            QuizAttempt.quiz_id == Quiz.id
+        ).correlate(Quiz).scalar_subquery()
+        
+        query = self.session.query(
+            Quiz.id,
+            Quiz.title,
+            Quiz.is_active,
+            Quiz.created_at,
+            question_count.label('question_count'),
+            attempt_count.label('attempt_count')
+        )
+        return self._paginate(query.order_by(Quiz.created_at.desc()), limit, offset).all()
     
     def get_quiz_with_questions(self, quiz_id: int) -> Optional[Quiz]:
         """Get quiz with all questions and options"""
-        return self.session.query(Quiz).filter(
+        return self.session.query(Quiz).options(
+            selectinload(Quiz.questions).selectinload(Question.options)
+        ).filter(
             Quiz.id == quiz_id
         ).first()
     
@@ -122,6 +382,7 @@ class DatabaseManager:
                     setattr(quiz, key, value)
             quiz.updated_at = datetime.now(timezone.utc)
             self.save_changes()
+            self._invalidate_analytics(quiz_id)
         return quiz
     
     def delete_quiz(self, quiz_id: int) -> bool:
@@ -130,6 +391,8 @@ class DatabaseManager:
         if quiz:
             self.session.delete(quiz)
             self.save_changes()
+            self._lookup_cache.pop(('quiz', quiz_id), None)
+            self._invalidate_analytics(quiz_id)
             return True
         return False
     
@@ -163,17 +426,39 @@ class DatabaseManager:
             and_(QuizAttempt.user_id == user_id, QuizAttempt.quiz_id == quiz_id)
         ).count()
     
-    def get_user_attempts(self, user_id: int) -> List[QuizAttempt]:
+    def get_user_attempts(self, user_id: int, limit: Optional[int] = 50, offset: int = 0) -> List[QuizAttempt]:
         """Get all attempts by a user"""
-        return self.session.query(QuizAttempt).filter(
+        query = self.session.query(QuizAttempt).filter(
             QuizAttempt.user_id == user_id
-        ).order_by(QuizAttempt.started_at.desc()).all()
+        ).order_by(QuizAttempt.started_at.desc())
+        return self._paginate(query, limit, offset).all()
+    
+    def get_quiz_attempt_stats(self, quiz_id: int) -> Dict[str, Any]:
+        """Get attempt counts, average score/time and pass count for a quiz in one aggregate"""
+        completed = QuizAttempt.status == 'completed'
+        total_attempts, completed_attempts, average_score, average_time, passed_attempts = self.session.query(
+            func.count(QuizAttempt.id),
+            func.count(QuizAttempt.id).filter(completed),
+            func.avg(QuizAttempt.percentage).filter(completed),
+            func.avg(QuizAttempt.time_taken).filter(completed),
+            func.count(QuizAttempt.id).filter(completed, QuizAttempt.is_passed == True)
+        ).filter(QuizAttempt.quiz_id == quiz_id).one()
+        
+        return {
+            'total_attempts': total_attempts,
+            'completed_attempts': completed_attempts,
+            'average_score': float(average_score or 0),
+            'average_time': float(average_time or 0),
+            'passed_attempts': passed_attempts,
+            'pass_rate': (passed_attempts / max(completed_attempts, 1)) * 100
+        }
     
-    def get_quiz_attempts(self, quiz_id: int) -> List[QuizAttempt]:
+    def get_quiz_attempts(self, quiz_id: int, limit: Optional[int] = None, offset: int = 0) -> List[QuizAttempt]:
         """Get all attempts for a quiz"""
-        return self.session.query(QuizAttempt).filter(
+        query = self.session.query(QuizAttempt).filter(
             QuizAttempt.quiz_id == quiz_id
-        ).order_by(QuizAttempt.started_at.desc()).all()
+        ).order_by(QuizAttempt.started_at.desc())
+        return self._paginate(query, limit, offset).all()
     
     def get_recent_attempts(self, days: int = 7) -> List[QuizAttempt]:
         """Get recent quiz attempts"""
@@ -185,7 +470,9 @@ class DatabaseManager:
     def create_quiz_attempt(self, attempt_data: Dict[str, Any]) -> QuizAttempt:
         """Create a new quiz attempt"""
         attempt = QuizAttempt(**attempt_data)
-        return self.add_and_commit(attempt)
+        self.add_and_commit(attempt)
+        self._invalidate_analytics(attempt.quiz_id)
+        return attempt
     
     # Answer operations
     def create_answer(self, answer_data: Dict[str, Any]) -> Answer:
@@ -193,6 +480,18 @@ class DatabaseManager:
         answer = Answer(**answer_data)
         return self.add_and_commit(answer)
     
+    def create_answers(self, answers_data: List[Dict[str, Any]]):
+        """Insert all answers of an attempt in one executemany round-trip"""
+        if not answers_data:
+            return
+        try:
+            self.session.execute(insert(Answer), answers_data)
+            self.session.commit()
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            logger.error(f"Database error: {e}")
+            raise
+    
     def get_attempt_answers(self, attempt_id: int) -> List[Answer]:
         """Get all answers for an attempt"""
         return self.session.query(Answer).filter(
@@ -205,6 +504,60 @@ class DatabaseManager:
         log = SystemLog(**log_data)
         return self.add_and_commit(log)
     
+    def log_system_event(self, event_type: str, message: str, metadata: Optional[Dict[str, Any]] = None,
+                         user_id: Optional[int] = None, admin_user_id: Optional[int] = None):
+        """Queue a system log entry; written to the database by flush_system_logs"""
+        self._pending_logs.append({
+            'event_type': event_type,
+            'message': message,
+            'user_id': user_id,
+            'admin_user_id': admin_user_id,
+            'metadata': metadata,
+            'created_at': datetime.now(timezone.utc)
+        })
+        if self._log_flusher is None:
+            self._start_log_flusher()
+        elif len(self._pending_logs) >= self.LOG_FLUSH_BATCH:
+            self._log_flush_wakeup.set()
+    
+    def _start_log_flusher(self):
+        """Start the background thread that writes queued system logs"""
+        with self._log_flusher_lock:
+            if self._log_flusher is not None:
+                return
+            self._log_flusher = threading.Thread(target=self._run_log_flusher, name='system-log-flusher', daemon=True)
+            self._log_flusher.start()
+            atexit.register(self.flush_system_logs)
+    
+    def _run_log_flusher(self):
+        """Flush queued system logs every LOG_FLUSH_INTERVAL, or sooner once a batch fills up"""
+        while True:
+            self._log_flush_wakeup.wait(self.LOG_FLUSH_INTERVAL)
+            self._log_flush_wakeup.clear()
+            self.flush_system_logs()
+    
+    def flush_system_logs(self):
+        """Write all queued system log entries in one executemany INSERT"""
+        with self._log_flush_lock:
+            batch = list(self._retry_logs)
+            self._retry_logs.clear()
+            while True:
+                try:
+                    batch.append(self._pending_logs.popleft())
+                except IndexError:
+                    break
+            if not batch:
+                return
+            
+            # Use a separate connection so the flush never commits a request's half-done work
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(SystemLog.__table__), batch)
+            except SQLAlchemyError as e:
+                logger.error(f"Failed to flush system logs: {e}")
+                # Retried ahead of entries logged meanwhile; beyond LOG_BUFFER_SIZE the oldest fall off the left
+                self._retry_logs.extend(batch)
+    
     def get_recent_logs(self, limit: int = 100, event_type: Optional[str] = None) -> List[SystemLog]:
         """Get recent system logs"""
         query = self.session.query(SystemLog)
@@ -212,19 +565,58 @@ class DatabaseManager:
             query = query.filter(SystemLog.event_type == event_type)
         return query.order_by(SystemLog.created_at.desc()).limit(limit).all()
     
+    def get_log_event_types(self) -> List[str]:
+        """Get the distinct system log event types, cached like the analytics"""
+        return self._cached_analytics('log_event_types', lambda: [
+            event_type for event_type, in self.session.query(SystemLog.event_type).distinct()
+        ])
+    
     def cleanup_old_logs(self, days: int = 90):
         """Clean up old system logs"""
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
         deleted_count = self.session.query(SystemLog).filter(
             SystemLog.created_at < cutoff_date
-        ).delete()
+        ).delete(synchronize_session=False)
         self.save_changes()
         return deleted_count
     
+    def ensure_indexes(self):
+        """Create columns and indexes missing from tables that predate them"""
+        # create_all() does not alter existing tables; indexes are built without locking writes
+        try:
+            conn = self.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to ensure database indexes: {e}")
+            return
+        
+        with conn:
+            # One failure must not skip the statements after it
+            for statement in self.COLUMN_STATEMENTS + self.INDEX_STATEMENTS:
+                try:
+                    match = self._CREATE_INDEX_RE.match(statement)
+                    if match:
+                        self._drop_invalid_index(conn, match.group(1))
+                    conn.execute(text(statement))
+                except SQLAlchemyError as e:
+                    logger.error(f"Failed to run schema statement {statement!r}: {e}")
+    
+    def _drop_invalid_index(self, conn, index_name: str):
+        """Drop an index left INVALID by an interrupted CREATE INDEX CONCURRENTLY, so IF NOT EXISTS rebuilds it"""
+        valid = conn.execute(
+            text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+            {'name': index_name}
+        ).scalar()
+        if valid is False:
+            logger.warning(f"Rebuilding invalid index {index_name}")
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+    
     # Admin user operations
     def get_admin_user_by_username(self, username: str) -> Optional[AdminUser]:
         """Get admin user by username"""
-        return self.session.query(AdminUser).filter(AdminUser.username == username).first()
+        return self._cached_lookup(
+            ('admin_username', username),
+            lambda: self.session.query(AdminUser).filter(AdminUser.username == username).first()
+        )
     
     def get_admin_user_by_email(self, email: str) -> Optional[AdminUser]:
         """Get admin user by email"""
@@ -236,51 +628,147 @@ class DatabaseManager:
         return self.add_and_commit(admin)
     
     # Statistics and analytics
+    def _cached_analytics(self, key: str, loader):
+        """Return a JSON-serializable analytics result, reusing it within the current time slice"""
+        return self._cached_analytics_many([key], lambda missing: {key: loader()})[key]
+    
+    def _cached_analytics_many(self, keys: List[str], loader) -> Dict[str, Any]:
+        """Return analytics results for several keys; loader computes all misses in one call"""
+        window = int(time.time() // self.ANALYTICS_LOCAL_WINDOW)
+        results = {}
+        for key in keys:
+            windowed = self._windowed_analytics.get(self.ANALYTICS_CACHE_PREFIX + key)
+            if windowed and windowed[0] == window:
+                results[key] = windowed[1]
+        
+        missing = [key for key in keys if key not in results]
+        if missing:
+            for key, result in self._shared_analytics(missing, loader).items():
+                results[key] = result
+                if result:
+                    self._windowed_analytics[self.ANALYTICS_CACHE_PREFIX + key] = (window, result)
+        return results
+    
+    def _shared_analytics(self, keys: List[str], loader) -> Dict[str, Any]:
+        """Return analytics results from Redis, computing the misses"""
+        cache_keys = [self.ANALYTICS_CACHE_PREFIX + key for key in keys]
+        results = {}
+        try:
+            for key, cached in zip(keys, self._analytics_cache.mget(cache_keys)):
+                if cached is not None:
+                    results[key] = json.loads(cached)
+        except redis.RedisError as e:
+            logger.warning(f"Analytics cache read failed: {e}")
+            now = time.monotonic()
+            for key, cache_key in zip(keys, cache_keys):
+                local = self._local_analytics.get(cache_key)
+                if local and local[0] > now:
+                    results[key] = local[1]
+        
+        missing = [key for key in keys if key not in results]
+        if not missing:
+            return results
+        
+        computed = loader(missing)
+        results.update(computed)
+        to_store = {self.ANALYTICS_CACHE_PREFIX + key: result for key, result in computed.items() if result}
+        if to_store:
+            try:
+                pipe = self._analytics_cache.pipeline(transaction=False)
+                for cache_key, result in to_store.items():
+                    pipe.setex(cache_key, self.ANALYTICS_CACHE_TTL, json.dumps(result))
+                pipe.execute()
+            except redis.RedisError as e:
+                logger.warning(f"Analytics cache write failed: {e}")
+                expires_at = time.monotonic() + self.ANALYTICS_CACHE_TTL
+                for cache_key, result in to_store.items():
+                    self._local_analytics[cache_key] = (expires_at, result)
+        return results
+    
+    def _invalidate_analytics(self, quiz_id: Optional[int] = None):
+        """Drop cached system statistics and, if given, one quiz's analytics"""
+        keys = [self.ANALYTICS_CACHE_PREFIX + 'system']
+        if quiz_id is not None:
+            keys.append(f"{self.ANALYTICS_CACHE_PREFIX}quiz:{quiz_id}")
+        for key in keys:
+            self._local_analytics.pop(key, None)
+            self._windowed_analytics.pop(key, None)
+        try:
+            self._analytics_cache.delete(*keys)
+        except redis.RedisError as e:
+            logger.warning(f"Analytics cache invalidation failed: {e}")
+    
     def get_system_stats(self) -> Dict[str, Any]:
         """Get comprehensive system statistics"""
+        return self._cached_analytics('system', self._build_system_stats)
+    
+    def _build_system_stats(self) -> Dict[str, Any]:
+        """Assemble system statistics from the database"""
+        # Prefer the periodically refreshed single-row view, fall back to live aggregates
+        stats = self._read_system_stats_view() or self._query_system_stats()
+        
+        # Database size (approximate)
+        stats['db_size'] = self._get_database_size()
+        
+        # Last backup info
+        stats['last_backup'] = self._get_last_backup_info()
+        
+        return stats
+    
+    def _read_system_stats_view(self) -> Optional[Dict[str, Any]]:
+        """Read precomputed statistics from mv_system_stats"""
+        try:
+            with self.engine.connect() as conn:
+                row = conn.execute(text(f"SELECT {', '.join(self.SYSTEM_STATS_FIELDS)} FROM mv_system_stats")).first()
+        except SQLAlchemyError as e:
+            logger.debug(f"System stats view unavailable: {e}")
+            return None
+        
+        if row is None:
+            return None
+        
+        stats = dict(row._mapping)
+        stats['average_score'] = float(stats['average_score'] or 0)
+        stats['pass_rate'] = float(stats['pass_rate'] or 0)
+        stats['most_popular_quiz'] = stats['most_popular_quiz'] or 'None'
+        return stats
+    
+    def _query_system_stats(self) -> Dict[str, Any]:
+        """Compute statistics directly from the tables"""
         now = datetime.now(timezone.utc)
         week_ago = now - timedelta(days=7)
         month_ago = now - timedelta(days=30)
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         
         # User statistics
-        total_users = self.session.query(User).count()
-        active_users = self.session.query(User).filter(User.is_active == True).count()
-        new_users_week = self.session.query(User).filter(User.created_at >= week_ago).count()
-        new_users_month = self.session.query(User).filter(User.created_at >= month_ago).count()
+        total_users, active_users, new_users_week, new_users_month = self.session.query(
+            func.count(User.id),
+            func.count(User.id).filter(User.is_active == True),
+            func.count(User.id).filter(User.created_at >= week_ago),
+            func.count(User.id).filter(User.created_at >= month_ago)
+        ).one()
         
         # Quiz statistics
-        total_quizzes = self.session.query(Quiz).count()
-        active_quizzes = self.session.query(Quiz).filter(Quiz.is_active == True).count()
-        total_questions = self.session.query(Question).count()
-        
-        # Attempt statistics
-        total_attempts = self.session.query(QuizAttempt).count()
-        completed_attempts = self.session.query(QuizAttempt).filter(
-            QuizAttempt.status == 'completed'
-        ).count()
-        
-        attempts_today = self.session.query(QuizAttempt).filter(
-            QuizAttempt.started_at >= today_start
-        ).count()
-        
-        attempts_week = self.session.query(QuizAttempt).filter(
-            QuizAttempt.started_at >= week_ago
-        ).count()
+        total_quizzes, active_quizzes, total_questions = self.session.query(
+            func.count(Quiz.id),
+            func.count(Quiz.id).filter(Quiz.is_active == True),
+            self.session.query(func.count(Question.id)).scalar_subquery()
+        ).one()
         
-        # Average score and pass rate
-        completed_attempts_query = self.session.query(QuizAttempt).filter(
-            and_(QuizAttempt.status == 'completed', QuizAttempt.percentage.isnot(None))
-        )
+        # Attempt statistics, average score and pass rate
+        (total_attempts, completed_attempts, attempts_today, attempts_week,
+         avg_score_result, passed_attempts) = self.session.query(
+            func.count(QuizAttempt.id),
+            func.count(QuizAttempt.id).filter(QuizAttempt.status == 'completed'),
+            func.count(QuizAttempt.id).filter(QuizAttempt.started_at >= today_start),
+            func.count(QuizAttempt.id).filter(QuizAttempt.started_at >= week_ago),
+            func.avg(QuizAttempt.percentage).filter(
+                and_(QuizAttempt.status == 'completed', QuizAttempt.percentage.isnot(None))
+            ),
+            func.count(QuizAttempt.id).filter(QuizAttempt.is_passed == True)
+        ).one()
         
-        avg_score_result = completed_attempts_query.with_entities(
-            func.avg(QuizAttempt.percentage)
-        ).scalar()
         average_score = float(avg_score_result) if avg_score_result else 0.0
-        
-        passed_attempts = self.session.query(QuizAttempt).filter(
-            QuizAttempt.is_passed == True
-        ).count()
         pass_rate = (passed_attempts / max(completed_attempts, 1)) * 100
         
         # Most popular quiz
@@ -293,12 +781,6 @@ class DatabaseManager:
         
         most_popular_quiz = popular_quiz_result[0] if popular_quiz_result else 'None'
         
-        # Database size (approximate)
-        db_size = self._get_database_size()
-        
-        # Last backup info
-        last_backup = self._get_last_backup_info()
-        
         return {
             'total_users': total_users,
             'active_users': active_users,
@@ -313,120 +795,208 @@ class DatabaseManager:
             'attempts_week': attempts_week,
             'average_score': average_score,
             'pass_rate': pass_rate,
-            'most_popular_quiz': most_popular_quiz,
-            'db_size': db_size,
-            'last_backup': last_backup
+            'most_popular_quiz': most_popular_quiz
         }
     
+    def ensure_system_stats_view(self):
+        """Create the mv_system_stats materialized view if it does not exist"""
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text(self.SYSTEM_STATS_VIEW_SQL))
+                # REFRESH ... CONCURRENTLY requires a unique index on the view
+                conn.execute(text(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS ix_mv_system_stats_id ON mv_system_stats (id)"
+                ))
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to create system stats view: {e}")
+    
+    def refresh_system_stats(self):
+        """Recompute mv_system_stats without blocking readers"""
+        try:
+            with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_system_stats"))
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to refresh system stats view: {e}")
+    
+    def refresh_daily_activity(self, days: Optional[int] = DAILY_ACTIVITY_REFRESH_DAYS):
+        """Upsert the daily_activity rollup for the trailing days, or for all history when days is None"""
+        if days is None:
+            since = datetime.min
+        else:
+            since = datetime.combine(datetime.now().date() - timedelta(days=days - 1), datetime.min.time())
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text(self.DAILY_ACTIVITY_UPSERT_SQL), {'since': since})
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to refresh daily activity: {e}")
+    
+    def ensure_daily_activity(self):
+        """Backfill the daily_activity rollup when it is still empty"""
+        try:
+            with self.engine.connect() as conn:
+                empty = conn.execute(text("SELECT 1 FROM daily_activity LIMIT 1")).first() is None
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to check daily activity: {e}")
+            return
+        self.refresh_daily_activity(days=None if empty else self.DAILY_ACTIVITY_REFRESH_DAYS)
+    
+    def get_daily_activity(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+        """Get per-day attempt counts between two dates from the daily_activity rollup"""
+        rows = self.session.query(DailyActivity).filter(
+            DailyActivity.date.between(start_date.date(), end_date.date())
+        ).order_by(DailyActivity.date).all()
+        return [row.to_dict() for row in rows]
+    
     def get_quiz_analytics(self, quiz_id: int) -> Dict[str, Any]:
         """Get detailed analytics for a specific quiz"""
-        quiz = self.get_quiz_by_id(quiz_id)
-        if not quiz:
-            return {}
+        return self.get_quiz_analytics_bulk([quiz_id])[quiz_id]
+    
+    def get_quiz_analytics_bulk(self, quiz_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get detailed analytics for several quizzes, computing cache misses together"""
+        keys = {f'quiz:{quiz_id}': quiz_id for quiz_id in quiz_ids}
+        results = self._cached_analytics_many(list(keys), lambda missing: {
+            f'quiz:{quiz_id}': analytics
+            for quiz_id, analytics in self._build_quiz_analytics([keys[key] for key in missing]).items()
+        })
+        return {keys[key]: analytics for key, analytics in results.items()}
+    
+    def _build_quiz_analytics(self, quiz_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Compute analytics for quizzes from the database, one grouped query per table"""
+        # Unknown quizzes map to an empty dict
+        analytics = {quiz_id: {} for quiz_id in quiz_ids}
+        titles = dict(self.session.query(Quiz.id, Quiz.title).filter(Quiz.id.in_(quiz_ids)).all())
+        if not titles:
+            return analytics
         
-        attempts = self.get_quiz_attempts(quiz_id)
-        completed_attempts = [a for a in attempts if a.status == 'completed']
+        # Attempt statistics and score histogram in a single aggregate scan
+        completed = QuizAttempt.status == 'completed'
+        pct = QuizAttempt.percentage
+        attempt_stats = {
+            quiz_id: stats
+            for quiz_id, *stats in self.session.query(
+                QuizAttempt.quiz_id,
+                func.count(QuizAttempt.id),
+                func.count(QuizAttempt.id).filter(completed),
+                func.avg(pct).filter(completed),
+                func.avg(QuizAttempt.time_taken).filter(completed),
+                func.count(QuizAttempt.id).filter(completed, QuizAttempt.is_passed == True),
+                func.count(QuizAttempt.id).filter(completed, pct <= 20),
+                func.count(QuizAttempt.id).filter(completed, pct > 20, pct <= 40),
+                func.count(QuizAttempt.id).filter(completed, pct > 40, pct <= 60),
+                func.count(QuizAttempt.id).filter(completed, pct > 60, pct <= 80),
+                func.count(QuizAttempt.id).filter(completed, pct > 80)
+            ).filter(QuizAttempt.quiz_id.in_(titles)).group_by(QuizAttempt.quiz_id).all()
+        }
         
-        if not completed_attempts:
-            return {
-                'quiz_id': quiz_id,
-                'quiz_title': quiz.title,
-                'total_attempts': len(attempts),
-                'completed_attempts': 0,
-                'average_score': 0,
-                'pass_rate': 0,
-                'completion_rate': 0,
-                'average_time': 0,
-                'score_distribution': {},
-                'question_analytics': []
+        # Question-level data is only needed for quizzes with completed attempts
+        answered_quiz_ids = [quiz_id for quiz_id, stats in attempt_stats.items() if stats[1]]
+        questions_by_quiz: Dict[int, List[tuple]] = {}
+        answer_counts = {}
+        if answered_quiz_ids:
+            for question_id, quiz_id, question_text in self.session.query(
+                Question.id, Question.quiz_id, Question.question_text
+            ).filter(Question.quiz_id.in_(answered_quiz_ids)).order_by(Question.quiz_id, Question.order_index):
+                questions_by_quiz.setdefault(quiz_id, []).append((question_id, question_text))
+            
+            answer_counts = {
+                question_id: (total, correct or 0)
+                for question_id, total, correct in self.session.query(
+                    Answer.question_id,
+                    func.count(Answer.id),
+                    func.sum(case((Answer.is_correct == True, 1), else_=0))
+                ).join(Question, Question.id == Answer.question_id).filter(
+                    Question.quiz_id.in_(answered_quiz_ids)
+                ).group_by(Answer.question_id).all()
             }
         
-        # Basic statistics
-        total_attempts = len(attempts)
-        completed_count = len(completed_attempts)
-        completion_rate = (completed_count / max(total_attempts, 1)) * 100
-        
-        scores = [a.percentage for a in completed_attempts if a.percentage is not None]
-        average_score = sum(scores) / len(scores) if scores else 0
-        
-        passed_count = len([a for a in completed_attempts if a.is_passed])
-        pass_rate = (passed_count / max(completed_count, 1)) * 100
-        
-        times = [a.time_taken for a in completed_attempts if a.time_taken is not None]
-        average_time = sum(times) / len(times) if times else 0
-        
-        # Score distribution
-        score_ranges = {'0-20': 0, '21-40': 0, '41-60': 0, '61-80': 0, '81-100': 0}
-        for score in scores:
-            if score <= 20:
-                score_ranges['0-20'] += 1
-            elif score <= 40:
-                score_ranges['21-40'] += 1
-            elif score <= 60:
-                score_ranges['41-60'] += 1
-            elif score <= 80:
-                score_ranges['61-80'] += 1
-            else:
-                score_ranges['81-100'] += 1
-        
-        # Question-level analytics
-        question_analytics = []
-        for question in quiz.questions:
-            correct_answers = self.session.query(Answer).filter(
-                and_(
-                    Answer.question_id == question.id,
-                    Answer.is_correct == True
-                )
-            ).count()
+        for quiz_id, title in titles.items():
+            (total_attempts, completed_count, average_score, average_time, passed_count,
+             *bucket_counts) = attempt_stats.get(quiz_id, (0, 0, None, None, 0, 0, 0, 0, 0, 0))
             
-            total_answers = self.session.query(Answer).filter(
-                Answer.question_id == question.id
-            ).count()
+            if not completed_count:
+                analytics[quiz_id] = {
+                    'quiz_id': quiz_id,
+                    'quiz_title': title,
+                    'total_attempts': total_attempts,
+                    'completed_attempts': 0,
+                    'average_score': 0,
+                    'pass_rate': 0,
+                    'completion_rate': 0,
+                    'average_time': 0,
+                    'score_distribution': {},
+                    'question_analytics': []
+                }
+                continue
             
-            accuracy = (correct_answers / max(total_answers, 1)) * 100
+            # Basic statistics
+            completion_rate = (completed_count / max(total_attempts, 1)) * 100
+            average_score = float(average_score or 0)
+            pass_rate = (passed_count / max(completed_count, 1)) * 100
+            average_time = float(average_time or 0)
             
-            question_analytics.append({
-                'question_id': question.id,
-                'question_text': question.question_text[:100] + '...' if len(question.question_text) > 100 else question.question_text,
-                'total_answers': total_answers,
-                'correct_answers': correct_answers,
-                'accuracy': accuracy
-            })
+            # Score distribution
+            score_ranges = dict(zip(('0-20', '21-40', '41-60', '61-80', '81-100'), bucket_counts))
+            
+            # Question-level analytics
+            question_analytics = []
+            for question_id, question_text in questions_by_quiz.get(quiz_id, []):
+                total_answers, correct_answers = answer_counts.get(question_id, (0, 0))
+                
+                accuracy = (correct_answers / max(total_answers, 1)) * 100
+                
+                question_analytics.append({
+                    'question_id': question_id,
+                    'question_text': question_text[:100] + '...' if len(question_text) > 100 else question_text,
+                    'total_answers': total_answers,
+                    'correct_answers': correct_answers,
+                    'accuracy': accuracy
+                })
+            
+            analytics[quiz_id] = {
+                'quiz_id': quiz_id,
+                'quiz_title': title,
+                'total_attempts': total_attempts,
+                'completed_attempts': completed_count,
+                'completion_rate': completion_rate,
+                'average_score': average_score,
+                'pass_rate': pass_rate,
+                'average_time': average_time,
+                'score_distribution': score_ranges,
+                'question_analytics': question_analytics
+            }
         
-        return {
-            'quiz_id': quiz_id,
-            'quiz_title': quiz.title,
-            'total_attempts': total_attempts,
-            'completed_attempts': completed_count,
-            'completion_rate': completion_rate,
-            'average_score': average_score,
-            'pass_rate': pass_rate,
-            'average_time': average_time,
-            'score_distribution': score_ranges,
-            'question_analytics': question_analytics
-        }
+        return analytics
     
     def _get_database_size(self) -> str:
         """Get approximate database size"""
+        now = time.monotonic()
+        if self._db_size_cache is not None and now - self._db_size_cache[1] < self.DB_SIZE_CACHE_TTL:
+            return self._db_size_cache[0]
+        
         try:
             # This is a simplified approach - in production, you might want to use database-specific queries
             result = self.session.execute(
-                "SELECT pg_size_pretty(pg_database_size(current_database()))"
+                text("SELECT pg_size_pretty(pg_database_size(current_database()))")
             ).scalar()
-            return result or 'Unknown'
+            size = result or 'Unknown'
         except Exception:
-            return 'Unknown'
+            size = 'Unknown'
+        
+        self._db_size_cache = (size, now)
+        return size
     
     def _get_last_backup_info(self) -> str:
         """Get last backup information"""
         backup_path = self.config.BACKUP_PATH
         if os.path.exists(backup_path):
             try:
-                files = [f for f in os.listdir(backup_path) if f.endswith('.sql')]
-                if files:
-                    latest_file = max(files, key=lambda x: os.path.getctime(os.path.join(backup_path, x)))
-                    timestamp = os.path.getctime(os.path.join(backup_path, latest_file))
-                    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
+                with os.scandir(backup_path) as entries:
+                    latest_ctime = max(
+                        (e.stat().st_ctime for e in entries if e.name.endswith(('.sql', '.dump'))),
+                        default=None
+                    )
+                if latest_ctime is not None:
+                    return datetime.fromtimestamp(latest_ctime).strftime('%Y-%m-%d %H:%M')
             except Exception:
                 pass
         return 'Never'
@@ -438,16 +1008,33 @@ class DatabaseManager:
             os.makedirs(backup_dir, exist_ok=True)
             
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_file = os.path.join(backup_dir, f'quiz_bot_backup_{timestamp}.sql')
+            backup_file = os.path.join(backup_dir, f'quiz_bot_backup_{timestamp}.dump')
             
             # Extract database connection details
-            db_url = self.config.SQLALCHEMY_DATABASE_URI
-            # This is a simplified backup - in production, use proper pg_dump with credentials
+            db_url = make_url(self.config.SQLALCHEMY_DATABASE_URI)
+            env = os.environ.copy()
+            if db_url.password:
+                env['PGPASSWORD'] = db_url.password
             
-            # For now, return a placeholder
-            with open(backup_file, 'w') as f:
-                f.write(f"-- Database backup created at {datetime.now()}\n")
-                f.write("-- This is a placeholder backup file\n")
+            cmd = ['pg_dump', '--no-password', '-Fc', '-Z', '6', '-f', backup_file]
+            if db_url.host:
+                cmd += ['-h', db_url.host]
+            if db_url.port:
+                cmd += ['-p', str(db_url.port)]
+            if db_url.username:
+                cmd += ['-U', db_url.username]
+            cmd += ['-d', db_url.database]
+            
+            # pg_dump writes the file itself, nothing is buffered in Python
+            result = subprocess.run(
+                cmd,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=300
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"pg_dump failed: {result.stderr.decode('utf-8', 'replace')}")
             
             return backup_file
         except Exception as e:
@@ -467,11 +1054,10 @@ class DatabaseManager:
         deleted_count = 0
         
         try:
-            for filename in os.listdir(backup_dir):
-                if filename.endswith('.sql'):
-                    file_path = os.path.join(backup_dir, filename)
-                    if os.path.getctime(file_path) < cutoff_time:
-                        os.remove(file_path)
+            with os.scandir(backup_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(('.sql', '.dump')) and entry.stat().st_ctime < cutoff_time:
+                        os.remove(entry.path)
                         deleted_count += 1
         except Exception as e:
             logger.error(f"Backup cleanup failed: {e}")
@@ -482,4 +1068,187 @@ class DatabaseManager:
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close_session()
\ No newline at end of file
+        self.close_session()
+
+class AsyncDatabaseManager:
+    """Async database operations manager for the Telegram bot"""
+    
+    # Seconds between batched last_activity writes
+    ACTIVITY_FLUSH_INTERVAL = 5
+    
+    def __init__(self, config: Config):
+        self.config = config
+        
+        url = make_url(config.SQLALCHEMY_DATABASE_URI).set(drivername='postgresql+asyncpg')
+        connect_args = {}
+        if 'sslmode' in url.query:
+            # asyncpg does not understand libpq's sslmode URL parameter
+            connect_args['ssl'] = url.query['sslmode']
+            url = url.difference_update_query(['sslmode'])
+        
+        self.engine = create_async_engine(
+            url,
+            connect_args=connect_args,
+            **{**DatabaseManager.DEFAULT_ENGINE_OPTIONS, **config.SQLALCHEMY_ENGINE_OPTIONS}
+        )
+        self.SessionLocal = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        self._session = None
+        self._pending_activity: Dict[int, datetime] = {}
+    
+    @property
+    def session(self) -> AsyncSession:
+        """Get current database session"""
+        if self._session is None:
+            self._session = self.SessionLocal()
+        return self._session
+    
+    async def close_session(self):
+        """Close current database session"""
+        if self._session:
+            await self._session.close()
+            self._session = None
+    
+    async def save_changes(self):
+        """Commit current session changes"""
+        try:
+            await self.session.commit()
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logger.error(f"Database error: {e}")
+            raise
+    
+    async def add_and_commit(self, obj):
+        """Add object to session and commit"""
+        try:
+            self.session.add(obj)
+            await self.session.commit()
+            return obj
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logger.error(f"Database error: {e}")
+            raise
+    
+    async def create_answers(self, answers_data: List[Dict[str, Any]]):
+        """Insert all answers of an attempt in one executemany round-trip"""
+        if not answers_data:
+            return
+        try:
+            await self.session.execute(insert(Answer), answers_data)
+            await self.session.commit()
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logger.error(f"Database error: {e}")
+            raise
+    
+    def update_user_activity(self, user_id: int):
+        """Record user activity; written to the database by flush_user_activity"""
+        self._pending_activity[user_id] = datetime.now(timezone.utc)
+    
+    async def flush_user_activity(self):
+        """Write all pending last_activity timestamps in one executemany UPDATE"""
+        if not self._pending_activity:
+            return
+        
+        batch, self._pending_activity = self._pending_activity, {}
+        # Use a separate session so the flush never commits a handler's half-done work
+        async with self.SessionLocal() as session:
+            try:
+                await session.execute(
+                    update(User),
+                    [{'id': user_id, 'last_activity': ts} for user_id, ts in batch.items()]
+                )
+                await session.commit()
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.error(f"Failed to flush user activity: {e}")
+                # Keep the newer timestamps recorded while flushing
+                self._pending_activity = {**batch, **self._pending_activity}
+    
+    async def run_activity_flusher(self):
+        """Periodically flush batched user activity until cancelled"""
+        try:
+            while True:
+                await asyncio.sleep(self.ACTIVITY_FLUSH_INTERVAL)
+                await self.flush_user_activity()
+        finally:
+            await self.flush_user_activity()
+    
+    # User operations
+    async def get_user_by_telegram_id(self, telegram_id: str) -> Optional[User]:
+        """Get user by Telegram ID"""
+        result = await self.session.execute(select(User).where(User.telegram_id == telegram_id))
+        return result.scalars().first()
+    
+    async def get_user_by_id(self, user_id: int) -> Optional[User]:
+        """Get user by ID"""
+        return await self.session.get(User, user_id)
+    
+    # Quiz operations
+    async def get_quiz_by_id(self, quiz_id: int) -> Optional[Quiz]:
+        """Get quiz by ID"""
+        return await self.session.get(Quiz, quiz_id)
+    
+    async def get_quiz_with_questions(self, quiz_id: int) -> Optional[Quiz]:
+        """Get quiz with all questions and options"""
+        result = await self.session.execute(
+            select(Quiz).options(
+                selectinload(Quiz.questions).selectinload(Question.options)
+            ).where(Quiz.id == quiz_id)
+        )
+        return result.scalars().first()
+    
+    async def get_active_quizzes(self) -> List[Quiz]:
+        """Get all active quizzes"""
+        result = await self.session.execute(
+            select(Quiz).where(Quiz.is_active == True).order_by(Quiz.created_at.desc())
+        )
+        return list(result.scalars().all())
+    
+    # Question operations
+    async def get_question_by_id(self, question_id: int) -> Optional[Question]:
+        """Get question by ID"""
+        return await self.session.get(Question, question_id)
+    
+    async def get_question_option_by_id(self, option_id: int) -> Optional[QuestionOption]:
+        """Get question option by ID"""
+        return await self.session.get(QuestionOption, option_id)
+    
+    # Quiz attempt operations
+    async def get_quiz_attempt(self, attempt_id: int) -> Optional[QuizAttempt]:
+        """Get quiz attempt by ID"""
+        return await self.session.get(QuizAttempt, attempt_id)
+    
+    async def get_user_quiz_attempts(self, user_id: int, quiz_id: int) -> int:
+        """Get count of user's attempts for a specific quiz"""
+        result = await self.session.execute(
+            select(func.count(QuizAttempt.id)).where(
+                and_(QuizAttempt.user_id == user_id, QuizAttempt.quiz_id == quiz_id)
+            )
+        )
+        return result.scalar_one()
+    
+    async def get_user_attempt_count(self, user_id: int) -> int:
+        """Get count of all attempts by a user"""
+        result = await self.session.execute(
+            select(func.count(QuizAttempt.id)).where(QuizAttempt.user_id == user_id)
+        )
+        return result.scalar_one()
+    
+    async def get_user_attempts(self, user_id: int, limit: Optional[int] = 50, offset: int = 0) -> List[QuizAttempt]:
+        """Get all attempts by a user, with their quizzes loaded"""
+        result = await self.session.execute(
+            select(QuizAttempt).options(selectinload(QuizAttempt.quiz)).where(
+                QuizAttempt.user_id == user_id
+            ).order_by(QuizAttempt.started_at.desc()).limit(limit).offset(offset)
+        )
+        return list(result.scalars().all())
+    
+    async def calculate_attempt_score(self, attempt: QuizAttempt):
+        """Calculate an attempt's score, allowing its relationships to load"""
+        return await self.session.run_sync(lambda session: attempt.calculate_score())
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close_session()
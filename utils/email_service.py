@@ -1,22 +1,229 @@
+import asyncio
+import base64
+import io
 import logging
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+from html.parser import HTMLParser
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional, Dict, Any
 import os
-import json
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 
 from config import Config
 from models import Quiz, QuizAttempt, User
 
+# smtplib and the email package are imported where mail is actually sent, keeping them off startup
+if TYPE_CHECKING:
+    import smtplib
+    from email.message import EmailMessage
+
 logger = logging.getLogger(__name__)
 
+class _HTMLTextExtractor(HTMLParser):
+    """Collects the readable text of an HTML email, one line per block element"""
+    
+    BLOCK_TAGS = frozenset({'p', 'div', 'h1', 'h2', 'h3', 'h4', 'table'})
+    LINE_TAGS = frozenset({'tr', 'li', 'br'})
+    SKIP_TAGS = frozenset({'head', 'style', 'script', 'title'})
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts: List[str] = []
+        self._skip_depth = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS or tag in self.LINE_TAGS:
+            self._parts.append('\n')
+        elif tag == 'td':
+            self._parts.append(' ')
+    
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append('\n')
+    
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._parts.append(data)
+    
+    def text(self) -> str:
+        lines = (' '.join(line.split()) for line in ''.join(self._parts).splitlines())
+        # Keep at most one blank line between blocks
+        return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+def html_to_text(html_body: str) -> str:
+    """Derive a plain-text email body from its HTML version"""
+    parser = _HTMLTextExtractor()
+    parser.feed(html_body)
+    parser.close()
+    return parser.text()
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S UTC'
+
+# Fallbacks for daily report figures missing from the stats dict
+DAILY_REPORT_DEFAULTS = {
+    'total_users': 0, 'active_users': 0, 'new_users_week': 0, 'new_users_month': 0,
+    'total_quizzes': 0, 'active_quizzes': 0, 'total_questions': 0,
+    'total_attempts': 0, 'completed_attempts': 0, 'attempts_today': 0, 'attempts_week': 0,
+    'average_score': 0, 'pass_rate': 0, 'most_popular_quiz': 'None',
+    'db_size': 'Unknown', 'last_backup': 'Never',
+}
+
+@lru_cache(maxsize=2)
+def smtp_policy(eight_bit: bool):
+    """Bodies are sent unencoded to servers advertising 8BITMIME, transfer-encoded otherwise"""
+    from email.policy import SMTP
+    return SMTP.clone(cte_type='8bit' if eight_bit else '7bit')
+
+# Pass/fail presentation for completion notifications, picked once per render
+RESULT_STYLES = {
+    True: {'css_class': 'passed', 'heading': '✅ Quiz Passed!', 'status': 'Passed'},
+    False: {'css_class': 'failed', 'heading': '❌ Quiz Failed', 'status': 'Failed'}
+}
+
+EMAIL_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates', 'email')
+EMAIL_TEMPLATES = (
+    'quiz_completion.html',
+    'daily_report.html',
+    'quiz_export.txt',
+    'system_alert.txt'
+)
+
+class _SMTPDataWriter:
+    """Binary sink for BytesGenerator that dot-stuffs lines and streams them to the SMTP socket"""
+    
+    BUFFER_SIZE = 64 * 1024
+    
+    def __init__(self, sock):
+        self._sock = sock
+        self._buffer = bytearray()
+        self._at_line_start = True
+    
+    def write(self, data: bytes):
+        if not data:
+            return
+        # A leading '.' on any line must be doubled (RFC 5321 section 4.5.2)
+        if self._at_line_start and data[:1] == b'.':
+            self._buffer += b'.'
+        self._buffer += data.replace(b'\n.', b'\n..')
+        self._at_line_start = data.endswith(b'\n')
+        if len(self._buffer) >= self.BUFFER_SIZE:
+            self.flush()
+    
+    def flush(self):
+        if self._buffer:
+            self._sock.sendall(self._buffer)
+            self._buffer.clear()
+    
+    def finish(self):
+        """Terminate the DATA section"""
+        if not self._at_line_start:
+            self._buffer += b'\r\n'
+        self._buffer += b'.\r\n'
+        self.flush()
+
+class _SMTPPool:
+    """Thread-safe pool of authenticated SMTP connections"""
+    
+    def __init__(self, connect, max_size: int = 5, max_messages: int = 100):
+        self._connect = connect
+        self._max_messages = max_messages
+        self._idle = queue.LifoQueue(maxsize=max_size)
+        # Bounds the number of open connections, idle or checked out
+        self._slots = threading.BoundedSemaphore(max_size)
+    
+    @contextmanager
+    def acquire(self):
+        """Check out a live connection, returning it to the pool afterwards"""
+        import smtplib
+        
+        self._slots.acquire()
+        entry = None
+        try:
+            entry = self._checkout()
+            yield entry[0]
+            entry[1] += 1
+        except (smtplib.SMTPServerDisconnected, OSError):
+            # Do not hand a dead socket to the next caller
+            if entry:
+                self._discard(entry[0])
+                entry = None
+            raise
+        finally:
+            if entry:
+                self._checkin(entry)
+            self._slots.release()
+    
+    def _checkout(self) -> list:
+        """Return an idle [server, sent_count] entry that still answers, or a new one"""
+        import smtplib
+        
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                return [self._connect(), 0]
+            try:
+                if entry[0].noop()[0] == 250:
+                    return entry
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(entry[0])
+    
+    def _checkin(self, entry: list):
+        """Return a connection to the pool or recycle it once it has sent enough"""
+        if entry[1] >= self._max_messages:
+            self._discard(entry[0], quit=True)
+            return
+        try:
+            self._idle.put_nowait(entry)
+        except queue.Full:
+            self._discard(entry[0], quit=True)
+    
+    @staticmethod
+    def _discard(server: 'smtplib.SMTP', quit: bool = False):
+        """Close a connection, politely if it is still usable"""
+        try:
+            if quit:
+                server.quit()
+            else:
+                server.close()
+        except Exception:
+            server.close()
+    
+    def close_all(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(server, quit=True)
+
 class EmailService:
     """Email service for sending notifications and reports"""
     
+    # Queued completion notifications; bounded so a stalled SMTP server applies backpressure
+    NOTIFICATION_QUEUE_SIZE = 1024
+    NOTIFICATION_BATCH_SIZE = 32
+    
+    # Whole 57-byte base64 lines per read, so chunks encode without padding or line breaks mid-line
+    ATTACHMENT_CHUNK_SIZE = 57 * 4096
+    
+    # Rendered bodies kept for repeat sends of the same report/notification
+    RENDER_CACHE_SIZE = 64
+    RENDER_CACHE_TTL = 300
+    
     def __init__(self, config: Config):
         self.config = config
         self.smtp_server = config.SMTP_SERVER
@@ -25,9 +232,57 @@ class EmailService:
         self.smtp_password = config.SMTP_PASSWORD
         self.smtp_use_tls = config.SMTP_USE_TLS
         self.default_from_email = config.DEFAULT_FROM_EMAIL
+        
+        # Email bodies are compiled once here and only rendered per message
+        self._env = Environment(
+            loader=FileSystemLoader(EMAIL_TEMPLATE_DIR),
+            autoescape=select_autoescape(['html']),
+            auto_reload=False,
+            cache_size=-1,
+            trim_blocks=True,
+            lstrip_blocks=True
+        )
+        self._templates = {name: self._env.get_template(name) for name in EMAIL_TEMPLATES}
+        self._render_cache: OrderedDict = OrderedDict()
+        self._render_cache_lock = threading.Lock()
+        
+        # Created on first use, inside the bot's running event loop
+        self._notification_queue: Optional[asyncio.Queue] = None
+        self._sender_task: Optional[asyncio.Task] = None
+        
+        # Reuse SMTP sessions instead of paying TCP/STARTTLS/AUTH on every send
+        self._pool = _SMTPPool(
+            self._create_smtp_connection,
+            max_size=getattr(config, 'SMTP_POOL_SIZE', 5),
+            max_messages=getattr(config, 'SMTP_MAX_MESSAGES_PER_CONNECTION', 100)
+        )
+    
+    def _render(self, template_name: str, **context) -> str:
+        """Render a precompiled email template"""
+        return self._templates[template_name].render(**context)
+    
+    def _render_cached(self, key: tuple, template_name: str, **context) -> tuple:
+        """Render an HTML template and its plain-text alternative once per key, reusing them within the TTL"""
+        now = time.monotonic()
+        with self._render_cache_lock:
+            cached = self._render_cache.get(key)
+            if cached and now - cached[1] < self.RENDER_CACHE_TTL:
+                self._render_cache.move_to_end(key)
+                return cached[0]
+        
+        html_body = self._render(template_name, **context)
+        rendered = (html_to_text(html_body), html_body)
+        with self._render_cache_lock:
+            self._render_cache[key] = (rendered, now)
+            self._render_cache.move_to_end(key)
+            while len(self._render_cache) > self.RENDER_CACHE_SIZE:
+                self._render_cache.popitem(last=False)
+        return rendered
     
     def _create_smtp_connection(self):
         """Create SMTP connection"""
+        import smtplib
+        
         try:
             server = smtplib.SMTP(self.smtp_server, self.smtp_port)
             if self.smtp_use_tls:
@@ -42,7 +297,7 @@ class EmailService:
     def send_email(self, 
                    to_emails: List[str], 
                    subject: str, 
-                   body: str, 
+                   body: Optional[str], 
                    html_body: Optional[str] = None,
                    attachments: Optional[List[Dict[str, Any]]] = None,
                    from_email: Optional[str] = None) -> bool:
@@ -57,29 +312,15 @@ class EmailService:
                 logger.error("No from email configured")
                 return False
             
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = from_email
-            msg['To'] = ', '.join(to_emails)
-            msg['Subject'] = subject
-            
-            # Add text body
-            text_part = MIMEText(body, 'plain', 'utf-8')
-            msg.attach(text_part)
-            
-            # Add HTML body if provided
-            if html_body:
-                html_part = MIMEText(html_body, 'html', 'utf-8')
-                msg.attach(html_part)
-            
-            # Add attachments if provided
-            if attachments:
-                for attachment in attachments:
-                    self._add_attachment(msg, attachment)
+            # The plain-text alternative can be derived from the HTML body
+            if body is None:
+                body = html_to_text(html_body or '')
             
-            # Send email
-            with self._create_smtp_connection() as server:
-                server.send_message(msg)
+            # Send email; all recipients go out as RCPT TOs of one SMTP transaction
+            with self._pool.acquire() as server:
+                policy = self._message_policy(server)
+                msg = self._build_message(to_emails, subject, body, html_body, attachments, from_email, policy)
+                self._send_message(server, msg, from_email, to_emails)
             
             logger.info(f"Email sent successfully to {', '.join(to_emails)}")
             return True
@@ -88,25 +329,177 @@ class EmailService:
             logger.error(f"Failed to send email: {e}")
             return False
     
-    def _add_attachment(self, msg: MIMEMultipart, attachment: Dict[str, Any]):
+    def send_bulk(self, messages: List[Dict[str, Any]]) -> int:
+        """Send several distinct emails (send_email keyword dicts) over one pooled connection"""
+        import smtplib
+        
+        sent = 0
+        pending = iter(messages)
+        while True:
+            attempted = 0
+            try:
+                with self._pool.acquire() as server:
+                    policy = self._message_policy(server)
+                    for message in pending:
+                        attempted += 1
+                        to_emails = message.get('to_emails')
+                        from_email = message.get('from_email') or self.default_from_email
+                        if not to_emails or not from_email:
+                            logger.warning("Skipping bulk email without recipients or sender")
+                            continue
+                        
+                        body = message.get('body')
+                        if body is None:
+                            body = html_to_text(message.get('html_body') or '')
+                        
+                        msg = self._build_message(
+                            to_emails,
+                            message['subject'],
+                            body,
+                            message.get('html_body'),
+                            message.get('attachments'),
+                            from_email,
+                            policy
+                        )
+                        try:
+                            self._send_message(server, msg, from_email, to_emails)
+                            sent += 1
+                        except smtplib.SMTPServerDisconnected:
+                            raise
+                        except smtplib.SMTPException as e:
+                            # The server rejected this message only; the connection stays usable for the rest
+                            logger.error(f"Failed to send email to {', '.join(to_emails)}: {e}")
+                break
+            except smtplib.SMTPServerDisconnected as e:
+                # The pool has discarded the dead connection; carry on with the next message on a fresh one
+                logger.error(f"SMTP connection lost during bulk send: {e}")
+                if not attempted:
+                    break
+            except Exception as e:
+                logger.error(f"Failed to send bulk emails: {e}")
+                break
+        
+        logger.info(f"Bulk send delivered {sent} of {len(messages)} emails")
+        return sent
+    
+    @staticmethod
+    def _message_policy(server: 'smtplib.SMTP'):
+        """Pick the encoding policy the connected server can accept"""
+        server.ehlo_or_helo_if_needed()
+        return smtp_policy(server.has_extn('8bitmime'))
+    
+    def _send_message(self, server: 'smtplib.SMTP', msg: 'EmailMessage', from_email: str, to_emails: List[str]):
+        """Run one SMTP transaction, streaming the message into DATA instead of flattening it to bytes first"""
+        import smtplib
+        from email.generator import BytesGenerator
+        
+        server.ehlo_or_helo_if_needed()
+        
+        mail_options = ['BODY=8BITMIME'] if msg.policy.cte_type == '8bit' else []
+        code, resp = server.mail(from_email, mail_options)
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPSenderRefused(code, resp, from_email)
+        
+        refused = {}
+        for recipient in to_emails:
+            code, resp = server.rcpt(recipient)
+            if code not in (250, 251):
+                refused[recipient] = (code, resp)
+        if len(refused) == len(to_emails):
+            server.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+        
+        code, resp = server.docmd('data')
+        if code != 354:
+            server.rset()
+            raise smtplib.SMTPDataError(code, resp)
+        
+        try:
+            writer = _SMTPDataWriter(server.sock)
+            BytesGenerator(writer, policy=msg.policy).flatten(msg)
+            writer.finish()
+        except Exception as e:
+            # The server is mid-DATA; the connection cannot be reused
+            server.close()
+            raise smtplib.SMTPServerDisconnected(f"Connection lost while sending message data: {e}")
+        
+        code, resp = server.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, resp)
+        
+        if refused:
+            logger.warning(f"Some recipients were refused: {', '.join(refused)}")
+    
+    def _build_message(self,
+                       to_emails: List[str],
+                       subject: str,
+                       body: str,
+                       html_body: Optional[str],
+                       attachments: Optional[List[Dict[str, Any]]],
+                       from_email: str,
+                       policy=None) -> 'EmailMessage':
+        """Build the MIME message for an email"""
+        from email.message import EmailMessage
+        
+        msg = EmailMessage(policy=policy or smtp_policy(False))
+        msg['From'] = from_email
+        msg['To'] = ', '.join(to_emails)
+        msg['Subject'] = subject
+        
+        # Add text body; ASCII goes out as 7bit, UTF-8 as 8bit when allowed, else the shorter of QP/base64
+        msg.set_content(body)
+        
+        # Add HTML body if provided
+        if html_body:
+            msg.add_alternative(html_body, subtype='html')
+        
+        # Add attachments if provided
+        if attachments:
+            for attachment in attachments:
+                self._add_attachment(msg, attachment)
+        
+        return msg
+    
+    def _add_attachment(self, msg: 'EmailMessage', attachment: Dict[str, Any]):
         """Add attachment to email message"""
+        from email.message import MIMEPart
+        
         try:
             filename = attachment['filename']
-            content = attachment['content']
             content_type = attachment.get('content_type', 'application/octet-stream')
             
-            part = MIMEBase(*content_type.split('/'))
-            part.set_payload(content)
-            encoders.encode_base64(part)
-            part.add_header(
-                'Content-Disposition',
-                f'attachment; filename= {filename}'
-            )
+            # Read from disk when given a path so the raw export never sits in memory
+            if attachment.get('file_path'):
+                with open(attachment['file_path'], 'rb') as source:
+                    encoded = self._encode_base64_stream(source)
+            else:
+                encoded = self._encode_base64_stream(io.BytesIO(attachment['content']))
+            
+            # Already encoded, so attach a raw part rather than add_attachment() re-encoding it
+            part = MIMEPart(policy=msg.policy)
+            part['Content-Type'] = content_type
+            part['Content-Transfer-Encoding'] = 'base64'
+            part.add_header('Content-Disposition', 'attachment', filename=filename)
+            part.set_payload(encoded)
+            
+            if msg.get_content_type() != 'multipart/mixed':
+                msg.make_mixed()
             msg.attach(part)
             
         except Exception as e:
             logger.error(f"Failed to add attachment {attachment.get('filename', 'unknown')}: {e}")
     
+    def _encode_base64_stream(self, source) -> str:
+        """Base64-encode a binary stream chunk by chunk into MIME-wrapped lines"""
+        encoded = bytearray()
+        while True:
+            chunk = source.read(self.ATTACHMENT_CHUNK_SIZE)
+            if not chunk:
+                break
+            encoded += base64.encodebytes(chunk)
+        return encoded.decode('ascii')
+    
     async def send_quiz_completion_notification(self, 
                                               quiz: Quiz, 
                                               attempt: QuizAttempt, 
@@ -120,258 +513,81 @@ class EmailService:
             # Prepare email content
             subject = f"Quiz Completed: {quiz.title} - {user.first_name} {user.last_name or ''}"
             
-            # Text body
-            body = f"""Quiz Completion Notification
-
-User Details:
-- Name: {user.first_name} {user.last_name or ''}
-- Username: @{user.username or 'Not set'}
-- Telegram ID: {user.telegram_id}
-- Email: {user.email or 'Not provided'}
-
-Quiz Details:
-- Title: {quiz.title}
-- Description: {quiz.description or 'No description'}
-
-Results:
-- Score: {attempt.score}/{attempt.max_score} ({attempt.percentage:.1f}%)
-- Status: {'Passed' if attempt.is_passed else 'Failed'}
-- Time Taken: {attempt.time_taken//60 if attempt.time_taken else 0}m {attempt.time_taken%60 if attempt.time_taken else 0}s
-- Completed At: {attempt.completed_at.strftime('%Y-%m-%d %H:%M:%S UTC') if attempt.completed_at else 'Unknown'}
-
-Passing Score: {quiz.passing_score}%
-
-This is an automated notification from the Telegram Quiz Bot system."""
-            
-            # HTML body
-            html_body = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <title>Quiz Completion Notification</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-        .header {{ background-color: #4CAF50; color: white; padding: 20px; text-align: center; border-radius: 5px 5px 0 0; }}
-        .content {{ background-color: #f9f9f9; padding: 20px; border-radius: 0 0 5px 5px; }}
-        .result-box {{ background-color: {'#d4edda' if attempt.is_passed else '#f8d7da'}; 
-                      border: 1px solid {'#c3e6cb' if attempt.is_passed else '#f5c6cb'}; 
-                      color: {'#155724' if attempt.is_passed else '#721c24'}; 
-                      padding: 15px; border-radius: 5px; margin: 15px 0; }}
-        .details {{ background-color: white; padding: 15px; border-radius: 5px; margin: 10px 0; }}
-        .footer {{ text-align: center; color: #666; font-size: 12px; margin-top: 20px; }}
-        table {{ width: 100%; border-collapse: collapse; }}
-        td {{ padding: 8px; border-bottom: 1px solid #ddd; }}
-        .label {{ font-weight: bold; width: 30%; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🎯 Quiz Completion Notification</h1>
-        </div>
-        <div class="content">
-            <div class="result-box">
-                <h2>{'✅ Quiz Passed!' if attempt.is_passed else '❌ Quiz Failed'}</h2>
-                <p><strong>Score: {attempt.score}/{attempt.max_score} ({attempt.percentage:.1f}%)</strong></p>
-            </div>
-            
-            <div class="details">
-                <h3>👤 User Information</h3>
-                <table>
-                    <tr><td class="label">Name:</td><td>{user.first_name} {user.last_name or ''}</td></tr>
-                    <tr><td class="label">Username:</td><td>@{user.username or 'Not set'}</td></tr>
-                    <tr><td class="label">Telegram ID:</td><td>{user.telegram_id}</td></tr>
-                    <tr><td class="label">Email:</td><td>{user.email or 'Not provided'}</td></tr>
-                </table>
-            </div>
-            
-            <div class="details">
-                <h3>📝 Quiz Information</h3>
-                <table>
-                    <tr><td class="label">Title:</td><td>{quiz.title}</td></tr>
-                    <tr><td class="label">Description:</td><td>{quiz.description or 'No description'}</td></tr>
-                    <tr><td class="label">Passing Score:</td><td>{quiz.passing_score}%</td></tr>
-                </table>
-            </div>
-            
-            <div class="details">
-                <h3>📊 Results</h3>
-                <table>
-                    <tr><td class="label">Score:</td><td>{attempt.score}/{attempt.max_score} ({attempt.percentage:.1f}%)</td></tr>
-                    <tr><td class="label">Status:</td><td>{'Passed' if attempt.is_passed else 'Failed'}</td></tr>
-                    <tr><td class="label">Time Taken:</td><td>{attempt.time_taken//60 if attempt.time_taken else 0}m {attempt.time_taken%60 if attempt.time_taken else 0}s</td></tr>
-                    <tr><td class="label">Completed:</td><td>{attempt.completed_at.strftime('%Y-%m-%d %H:%M:%S UTC') if attempt.completed_at else 'Unknown'}</td></tr>
-                </table>
-            </div>
-        </div>
-        <div class="footer">
-            <p>This is an automated notification from the Telegram Quiz Bot system.</p>
-            <p>Generated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}</p>
-        </div>
-    </div>
-</body>
-</html>"""
-            
-            # Send email
-            return self.send_email(
-                to_emails=quiz.notification_email_list,
-                subject=subject,
-                body=body,
-                html_body=html_body
+            body, html_body = self._render_cached(
+                ('quiz_completion', quiz.id, attempt.id),
+                'quiz_completion.html',
+                quiz=quiz, attempt=attempt, user=user,
+                result=RESULT_STYLES[bool(attempt.is_passed)],
+                generated_at=datetime.now().strftime(TIMESTAMP_FORMAT)
             )
             
+            # Hand off to the sender task so the quiz flow does not wait on SMTP
+            self._ensure_sender()
+            await self._notification_queue.put({
+                'to_emails': quiz.notification_email_list,
+                'subject': subject,
+                'body': body,
+                'html_body': html_body
+            })
+            return True
+            
         except Exception as e:
             logger.error(f"Failed to send quiz completion notification: {e}")
             return False
     
+    def _ensure_sender(self):
+        """Start the background notification sender if it is not running"""
+        if self._sender_task is None or self._sender_task.done():
+            # A restarted sender picks up whatever the previous one left queued
+            if self._notification_queue is None:
+                self._notification_queue = asyncio.Queue(maxsize=self.NOTIFICATION_QUEUE_SIZE)
+            self._sender_task = asyncio.create_task(self._sender_loop())
+    
+    async def _sender_loop(self):
+        """Send queued notifications in batches over one pooled connection"""
+        queue_ = self._notification_queue
+        while True:
+            messages = [await queue_.get()]
+            while len(messages) < self.NOTIFICATION_BATCH_SIZE and not queue_.empty():
+                messages.append(queue_.get_nowait())
+            
+            try:
+                # smtplib blocks for the whole SMTP exchange, so keep it off the event loop
+                await asyncio.to_thread(self.send_bulk, messages)
+            except Exception as e:
+                logger.error(f"Failed to send queued notifications: {e}")
+            finally:
+                for _ in messages:
+                    queue_.task_done()
+    
+    async def stop_sender(self):
+        """Send any queued notifications and stop the background sender"""
+        if self._sender_task is None:
+            return
+        if not self._sender_task.done():
+            await self._notification_queue.join()
+            self._sender_task.cancel()
+            try:
+                await self._sender_task
+            except asyncio.CancelledError:
+                pass
+        self._sender_task = None
+    
     def send_daily_report(self, stats: Dict[str, Any], to_emails: List[str]) -> bool:
         """Send daily statistics report"""
         try:
-            subject = f"Daily Quiz Bot Report - {datetime.now().strftime('%Y-%m-%d')}"
-            
-            body = f"""Daily Quiz Bot Statistics Report
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}
-
-User Statistics:
-- Total Users: {stats.get('total_users', 0)}
-- Active Users: {stats.get('active_users', 0)}
-- New Users (Last 7 days): {stats.get('new_users_week', 0)}
-- New Users (Last 30 days): {stats.get('new_users_month', 0)}
-
-Quiz Statistics:
-- Total Quizzes: {stats.get('total_quizzes', 0)}
-- Active Quizzes: {stats.get('active_quizzes', 0)}
-- Total Questions: {stats.get('total_questions', 0)}
-
-Attempt Statistics:
-- Total Attempts: {stats.get('total_attempts', 0)}
-- Completed Attempts: {stats.get('completed_attempts', 0)}
-- Attempts Today: {stats.get('attempts_today', 0)}
-- Attempts This Week: {stats.get('attempts_week', 0)}
-- Average Score: {stats.get('average_score', 0):.1f}%
-- Pass Rate: {stats.get('pass_rate', 0):.1f}%
-
-Most Popular Quiz: {stats.get('most_popular_quiz', 'None')}
-
-System Information:
-- Database Size: {stats.get('db_size', 'Unknown')}
-- Last Backup: {stats.get('last_backup', 'Never')}
-
-This is an automated report from the Telegram Quiz Bot system."""
-            
-            html_body = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <title>Daily Quiz Bot Report</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-        .container {{ max-width: 800px; margin: 0 auto; padding: 20px; }}
-        .header {{ background-color: #2196F3; color: white; padding: 20px; text-align: center; border-radius: 5px 5px 0 0; }}
-        .content {{ background-color: #f9f9f9; padding: 20px; border-radius: 0 0 5px 5px; }}
-        .stat-section {{ background-color: white; padding: 15px; border-radius: 5px; margin: 15px 0; }}
-        .stat-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; }}
-        .stat-item {{ background-color: #f8f9fa; padding: 10px; border-radius: 3px; text-align: center; }}
-        .stat-value {{ font-size: 24px; font-weight: bold; color: #2196F3; }}
-        .stat-label {{ font-size: 12px; color: #666; }}
-        .footer {{ text-align: center; color: #666; font-size: 12px; margin-top: 20px; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>📊 Daily Quiz Bot Report</h1>
-            <p>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}</p>
-        </div>
-        <div class="content">
-            <div class="stat-section">
-                <h3>👥 User Statistics</h3>
-                <div class="stat-grid">
-                    <div class="stat-item">
-                        <div class="stat-value">{stats.get('total_users', 0)}</div>
-                        <div class="stat-label">Total Users</div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-value">{stats.get('active_users', 0)}</div>
-                        <div class="stat-label">Active Users</div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-value">{stats.get('new_users_week', 0)}</div>
-                        <div class="stat-label">New Users (7 days)</div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-value">{stats.get('new_users_month', 0)}</div>
-                        <div class="stat-label">New Users (30 days)</div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="stat-section">
-                <h3>📝 Quiz Statistics</h3>
-                <div class="stat-grid">
-                    <div class="stat-item">
-                        <div class="stat-value">{stats.get('total_quizzes', 0)}</div>
-                        <div class="stat-label">Total Quizzes</div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-value">{stats.get('active_quizzes', 0)}</div>
-                        <div class="stat-label">Active Quizzes</div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-value">{stats.get('total_questions', 0)}</div>
-                        <div class="stat-label">Total Questions</div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="stat-section">
-                <h3>📊 Attempt Statistics</h3>
-                <div class="stat-grid">
-                    <div class="stat-item">
-                        <div class="stat-value">{stats.get('total_attempts', 0)}</div>
-                        <div class="stat-label">Total Attempts</div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-value">{stats.get('completed_attempts', 0)}</div>
-                        <div class="stat-label">Completed Attempts</div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-value">{stats.get('attempts_today', 0)}</div>
-                        <div class="stat-label">Attempts Today</div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-value">{stats.get('attempts_week', 0)}</div>
-                        <div class="stat-label">Attempts This Week</div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-value">{stats.get('average_score', 0):.1f}%</div>
-                        <div class="stat-label">Average Score</div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-value">{stats.get('pass_rate', 0):.1f}%</div>
-                        <div class="stat-label">Pass Rate</div>
-                    </div>
-                </div>
-            </div>
+            now = datetime.now()
+            subject = f"Daily Quiz Bot Report - {now.strftime('%Y-%m-%d')}"
             
-            <div class="stat-section">
-                <h3>🏆 Popular Content</h3>
-                <p><strong>Most Popular Quiz:</strong> {stats.get('most_popular_quiz', 'None')}</p>
-            </div>
+            # Apply defaults once so the template reads plain keys
+            report_stats = {**DAILY_REPORT_DEFAULTS, **stats}
             
-            <div class="stat-section">
-                <h3>⚙️ System Information</h3>
-                <p><strong>Database Size:</strong> {stats.get('db_size', 'Unknown')}</p>
-                <p><strong>Last Backup:</strong> {stats.get('last_backup', 'Never')}</p>
-            </div>
-        </div>
-        <div class="footer">
-            <p>This is an automated report from the Telegram Quiz Bot system.</p>
-        </div>
-    </div>
-</body>
-</html>"""
+            # Identical stats sent to several admins render once
+            body, html_body = self._render_cached(
+                ('daily_report', tuple(sorted(report_stats.items()))),
+                'daily_report.html',
+                stats=report_stats, generated_at=now.strftime(TIMESTAMP_FORMAT)
+            )
             
             return self.send_email(
                 to_emails=to_emails,
@@ -387,27 +603,27 @@ This is an automated report from the Telegram Quiz Bot system."""
     def send_quiz_export_email(self, 
                               to_emails: List[str], 
                               quiz_title: str, 
-                              export_data: bytes, 
-                              export_format: str = 'csv') -> bool:
-        """Send quiz export data via email"""
+                              export_data: Optional[bytes], 
+                              export_format: str = 'csv',
+                              export_path: Optional[str] = None) -> bool:
+        """Send quiz export data via email, from memory or from a file on disk"""
         try:
-            subject = f"Quiz Export: {quiz_title} - {datetime.now().strftime('%Y-%m-%d')}"
-            
-            body = f"""Quiz Export Data
-
-Quiz: {quiz_title}
-Export Format: {export_format.upper()}
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}
-
-Please find the exported quiz data attached to this email.
-
-This is an automated export from the Telegram Quiz Bot system."""
+            now = datetime.now()
+            subject = f"Quiz Export: {quiz_title} - {now.strftime('%Y-%m-%d')}"
+            
+            body = self._render(
+                'quiz_export.txt',
+                quiz_title=quiz_title,
+                export_format=export_format,
+                generated_at=now.strftime(TIMESTAMP_FORMAT)
+            )
             
             # Prepare attachment
-            filename = f"quiz_export_{quiz_title.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+            filename = f"quiz_export_{quiz_title.replace(' ', '_')}_{now.strftime('%Y%m%d_%H%M%S')}.{export_format}"
             attachments = [{
                 'filename': filename,
                 'content': export_data,
+                'file_path': export_path,
                 'content_type': f'application/{export_format}' if export_format == 'csv' else 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
             }]
             
@@ -439,21 +655,13 @@ This is an automated export from the Telegram Quiz Bot system."""
             
             subject = f"🚨 System Alert: {alert_type} - Quiz Bot"
             
-            body = f"""System Alert Notification
-
-Alert Type: {alert_type}
-Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}
-
-Message:
-{message}
-"""
-            
-            if details:
-                body += "\nAdditional Details:\n"
-                for key, value in details.items():
-                    body += f"- {key}: {value}\n"
-            
-            body += "\nThis is an automated alert from the Telegram Quiz Bot system."
+            body = self._render(
+                'system_alert.txt',
+                alert_type=alert_type,
+                message=message,
+                details=details,
+                generated_at=datetime.now().strftime(TIMESTAMP_FORMAT)
+            )
             
             return self.send_email(
                 to_emails=to_emails,
@@ -465,6 +673,10 @@ Message:
             logger.error(f"Failed to send system alert: {e}")
             return False
     
+    def close(self):
+        """Close pooled SMTP connections"""
+        self._pool.close_all()
+    
     def test_email_configuration(self) -> Dict[str, Any]:
         """Test email configuration"""
         try:
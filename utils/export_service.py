@@ -1,17 +1,16 @@
 import logging
 import io
 import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from operator import itemgetter
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-import pandas as pd
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.graphics.shapes import Drawing
-from reportlab.graphics.charts.barcharts import VerticalBarChart
-from reportlab.graphics.charts.piecharts import Pie
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy import Float, Numeric, String, func, case, cast, and_
 
 from config import Config
 from models import Quiz, QuizAttempt, User, Question, Answer
@@ -19,68 +18,156 @@ from utils.database import DatabaseManager
 
 logger = logging.getLogger(__name__)
 
+# ISO 8601 to the second, formatted by PostgreSQL's to_char
+EXPORT_TIMESTAMP_FORMAT = 'YYYY-MM-DD"T"HH24:MI:SS'
+
+def _timestamp_text(column):
+    """Select a timestamp column as export text, '' when NULL"""
+    return func.coalesce(func.to_char(column, EXPORT_TIMESTAMP_FORMAT), '')
+
+def _truncate(text: str, limit: int) -> str:
+    """Cut text to limit characters, marking the cut with '...'"""
+    return text[:limit] + '...' if len(text) > limit else text
+
+REPORT_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates', 'reports')
+
+@lru_cache(maxsize=1)
+def _report_templates() -> Environment:
+    """Jinja environment for the HTML report templates"""
+    return Environment(
+        loader=FileSystemLoader(REPORT_TEMPLATE_DIR),
+        autoescape=select_autoescape(['html']),
+        trim_blocks=True,
+        lstrip_blocks=True
+    )
+
+# reportlab and the Excel writers are imported on first export, keeping them off service startup
+@lru_cache(maxsize=1)
+def _pdf_styles() -> SimpleNamespace:
+    """Analytics PDF paragraph and table styles, built once and shared by every export"""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import TableStyle
+    
+    def header_table_style(font_size: int, *extra_commands) -> TableStyle:
+        """Grey bold header row over a beige, gridded body"""
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), font_size),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            *extra_commands
+        ])
+    
+    # Flowables hold per-build layout state, so Paragraphs are still created per document
+    sheet = getSampleStyleSheet()
+    return SimpleNamespace(
+        normal=sheet['Normal'],
+        section=sheet['Heading2'],
+        title=ParagraphStyle(
+            'CustomTitle',
+            parent=sheet['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=1  # Center alignment
+        ),
+        header_table=header_table_style(14),
+        score_table=header_table_style(12),
+        question_table=header_table_style(10, ('VALIGN', (0, 0), (-1, -1), 'TOP'))
+    )
+
 class ExportService:
     """Service for exporting quiz data in various formats"""
     
+    # Rows fetched per cursor round trip and written per streamed CSV chunk
+    CSV_BATCH_SIZE = 1000
+    
+    # Columns of the quiz results CSV and Excel exports
+    RESULT_HEADERS = [
+        'Attempt ID', 'Quiz Title', 'User Name', 'Username', 'Telegram ID',
+        'Email', 'Score', 'Max Score', 'Percentage', 'Status', 'Passed',
+        'Time Taken (seconds)', 'Started At', 'Completed At'
+    ]
+    
+    # Columns of the Excel question analysis sheet
+    QUESTION_ANALYSIS_HEADERS = [
+        'Question ID', 'Question Text', 'Question Type', 'Points',
+        'Total Answers', 'Correct Answers', 'Accuracy (%)'
+    ]
+    
+    # Header-only workbook returned for exports without attempts
+    _empty_results_xlsx: Optional[bytes] = None
+    
+    # Cuts an _attempt_rows_query row down to its export columns, in C
+    _attempt_export_row = staticmethod(itemgetter(slice(0, len(RESULT_HEADERS))))
+    
     def __init__(self, config: Config):
         self.config = config
         self.db_manager = DatabaseManager(config)
     
+    def _attempt_rows_query(self, quiz_id: Optional[int] = None):
+        """Query result export rows: one quiz's attempts, or all completed ones"""
+        # Outer joins leave the user columns NULL when the user is gone
+        no_user = User.id.is_(None)
+        
+        # The first len(RESULT_HEADERS) columns are the export row, derived by the database;
+        # the raw columns after them feed the quiz summary
+        query = self.db_manager.session.query(
+            QuizAttempt.id,
+            func.coalesce(Quiz.title, 'Unknown'),
+            case((no_user, 'Unknown'), else_=func.concat(User.first_name, ' ', func.coalesce(User.last_name, ''))),
+            case((no_user, 'Unknown'), else_=User.username),
+            func.coalesce(cast(User.telegram_id, String), 'Unknown'),
+            func.coalesce(User.email, 'Not provided'),
+            func.coalesce(QuizAttempt.score, 0),
+            func.coalesce(QuizAttempt.max_score, 0),
+            cast(func.round(cast(func.coalesce(QuizAttempt.percentage, 0), Numeric), 2), Float),
+            QuizAttempt.status,
+            case((QuizAttempt.is_passed == True, 'Yes'), else_='No'),
+            func.coalesce(QuizAttempt.time_taken, 0),
+            _timestamp_text(QuizAttempt.started_at),
+            _timestamp_text(QuizAttempt.completed_at),
+            QuizAttempt.percentage.label('percentage'),
+            QuizAttempt.is_passed.label('is_passed'),
+            QuizAttempt.time_taken.label('time_taken')
+        ).outerjoin(Quiz, Quiz.id == QuizAttempt.quiz_id).outerjoin(User, User.id == QuizAttempt.user_id)
+        
+        if quiz_id:
+            return query.filter(QuizAttempt.quiz_id == quiz_id).order_by(QuizAttempt.started_at.desc())
+        return query.filter(QuizAttempt.status == 'completed').order_by(QuizAttempt.completed_at.desc())
+    
+    def _csv_chunks(self, headers: List[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+        """Write rows as CSV, yielding the UTF-8 bytes every CSV_BATCH_SIZE rows"""
+        # Encode straight into a byte buffer rather than copying str buffers out and encoding them
+        buffer = io.BytesIO()
+        text = io.TextIOWrapper(buffer, encoding='utf-8', newline='', write_through=True)
+        writer = csv.writer(text)
+        writer.writerow(headers)
+        
+        # writerows loops in C; stop once a batch comes back empty
+        rows = iter(rows)
+        while True:
+            writer.writerows(islice(rows, self.CSV_BATCH_SIZE))
+            chunk = buffer.getvalue()
+            if not chunk:
+                return
+            yield chunk
+            buffer.seek(0)
+            buffer.truncate(0)
+    
+    def iter_quiz_results_csv(self, quiz_id: Optional[int] = None) -> Iterator[bytes]:
+        """Stream quiz results as CSV chunks while attempts are read from a server-side cursor"""
+        attempts = self._attempt_rows_query(quiz_id).yield_per(self.CSV_BATCH_SIZE)
+        return self._csv_chunks(self.RESULT_HEADERS, map(self._attempt_export_row, attempts))
+    
     def export_quiz_results_csv(self, quiz_id: Optional[int] = None) -> bytes:
         """Export quiz results to CSV format"""
         try:
-            # Get quiz attempts
-            if quiz_id:
-                attempts = self.db_manager.get_quiz_attempts(quiz_id)
-                quiz = self.db_manager.get_quiz_by_id(quiz_id)
-                filename_prefix = f"quiz_{quiz.title.replace(' ', '_')}_results" if quiz else "quiz_results"
-            else:
-                attempts = self.db_manager.session.query(QuizAttempt).filter(
-                    QuizAttempt.status == 'completed'
-                ).order_by(QuizAttempt.completed_at.desc()).all()
-                filename_prefix = "all_quiz_results"
-            
-            # Prepare CSV data
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Write header
-            headers = [
-                'Attempt ID', 'Quiz Title', 'User Name', 'Username', 'Telegram ID',
-                'Email', 'Score', 'Max Score', 'Percentage', 'Status', 'Passed',
-                'Time Taken (seconds)', 'Started At', 'Completed At'
-            ]
-            writer.writerow(headers)
-            
-            # Write data rows
-            for attempt in attempts:
-                user = attempt.user
-                quiz = attempt.quiz
-                
-                row = [
-                    attempt.id,
-                    quiz.title if quiz else 'Unknown',
-                    f"{user.first_name} {user.last_name or ''}" if user else 'Unknown',
-                    user.username if user else 'Unknown',
-                    user.telegram_id if user else 'Unknown',
-                    user.email or 'Not provided',
-                    attempt.score or 0,
-                    attempt.max_score or 0,
-                    round(attempt.percentage or 0, 2),
-                    attempt.status,
-                    'Yes' if attempt.is_passed else 'No',
-                    attempt.time_taken or 0,
-                    attempt.started_at.isoformat() if attempt.started_at else '',
-                    attempt.completed_at.isoformat() if attempt.completed_at else ''
-                ]
-                writer.writerow(row)
-            
-            # Convert to bytes
-            csv_content = output.getvalue()
-            output.close()
-            
-            return csv_content.encode('utf-8')
-            
+            return b''.join(self.iter_quiz_results_csv(quiz_id))
         except Exception as e:
             logger.error(f"Failed to export quiz results to CSV: {e}")
             raise
@@ -88,87 +175,109 @@ class ExportService:
     def export_quiz_results_excel(self, quiz_id: Optional[int] = None) -> bytes:
         """Export quiz results to Excel format"""
         try:
-            # Get quiz attempts
-            if quiz_id:
-                attempts = self.db_manager.get_quiz_attempts(quiz_id)
-                quiz = self.db_manager.get_quiz_by_id(quiz_id)
-            else:
-                attempts = self.db_manager.session.query(QuizAttempt).filter(
-                    QuizAttempt.status == 'completed'
-                ).order_by(QuizAttempt.completed_at.desc()).all()
-                quiz = None
-            
-            # Prepare data for DataFrame
-            data = []
-            for attempt in attempts:
-                user = attempt.user
-                quiz_obj = attempt.quiz
+            # No attempts: skip the worker thread and serve the header-only workbook
+            attempts_query = self._attempt_rows_query(quiz_id)
+            if not self.db_manager.session.query(attempts_query.exists()).scalar():
+                return self._empty_results_workbook()
+            
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # The question analysis queries run on a worker while the attempts load here
+                analysis_future = executor.submit(self._question_analysis_task, quiz_id) if quiz_id else None
                 
-                data.append({
-                    'Attempt ID': attempt.id,
-                    'Quiz Title': quiz_obj.title if quiz_obj else 'Unknown',
-                    'User Name': f"{user.first_name} {user.last_name or ''}" if user else 'Unknown',
-                    'Username': user.username if user else 'Unknown',
-                    'Telegram ID': user.telegram_id if user else 'Unknown',
-                    'Email': user.email or 'Not provided',
-                    'Score': attempt.score or 0,
-                    'Max Score': attempt.max_score or 0,
-                    'Percentage': round(attempt.percentage or 0, 2),
-                    'Status': attempt.status,
-                    'Passed': 'Yes' if attempt.is_passed else 'No',
-                    'Time Taken (seconds)': attempt.time_taken or 0,
-                    'Started At': attempt.started_at.isoformat() if attempt.started_at else '',
-                    'Completed At': attempt.completed_at.isoformat() if attempt.completed_at else ''
-                })
-            
-            # Create DataFrame
-            df = pd.DataFrame(data)
-            
-            # Create Excel file in memory
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # Main results sheet
-                df.to_excel(writer, sheet_name='Quiz Results', index=False)
+                attempts = attempts_query.all()
+                sheets = [('Quiz Results', self.RESULT_HEADERS, map(self._attempt_export_row, attempts))]
                 
-                # Summary sheet if specific quiz
+                # Summary and question analysis sheets if specific quiz
+                quiz = self.db_manager.get_quiz_by_id(quiz_id) if quiz_id else None
                 if quiz:
-                    summary_data = self._create_quiz_summary(quiz, attempts)
-                    summary_df = pd.DataFrame(summary_data)
-                    summary_df.to_excel(writer, sheet_name='Summary', index=False)
+                    sheets.append(('Summary', ['Metric', 'Value'], self._create_quiz_summary(quiz, attempts)))
                 
-                # Question analysis sheet if specific quiz
-                if quiz:
-                    question_analysis = self._create_question_analysis(quiz)
-                    if question_analysis:
-                        qa_df = pd.DataFrame(question_analysis)
-                        qa_df.to_excel(writer, sheet_name='Question Analysis', index=False)
+                question_analysis = analysis_future.result() if analysis_future else []
+                if question_analysis:
+                    sheets.append(('Question Analysis', self.QUESTION_ANALYSIS_HEADERS, question_analysis))
             
-            output.seek(0)
-            return output.read()
+            return self._write_workbook(sheets)
             
         except Exception as e:
             logger.error(f"Failed to export quiz results to Excel: {e}")
             raise
     
-    def export_users_csv(self) -> bytes:
-        """Export users data to CSV format"""
+    def _empty_results_workbook(self) -> bytes:
+        """Header-only results workbook, built on first use"""
+        if ExportService._empty_results_xlsx is None:
+            ExportService._empty_results_xlsx = self._write_workbook([('Quiz Results', self.RESULT_HEADERS, ())])
+        return ExportService._empty_results_xlsx
+    
+    def _question_analysis_task(self, quiz_id: int) -> List[tuple]:
+        """Build a quiz's question analysis on a worker thread, using that thread's own session"""
         try:
-            users = self.db_manager.get_all_users()
-            
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Write header
-            headers = [
-                'User ID', 'Telegram ID', 'Username', 'First Name', 'Last Name',
-                'Email', 'Phone Number', 'Is Active', 'Is Admin', 'Created At',
-                'Last Activity', 'Total Quiz Attempts'
-            ]
-            writer.writerow(headers)
-            
-            # Write data rows
+            quiz = self.db_manager.get_quiz_by_id(quiz_id)
+            return self._create_question_analysis(quiz) if quiz else []
+        finally:
+            self.db_manager.close_session()
+    
+    def _write_workbook(self, sheets: List[Tuple[str, List[str], Iterable[tuple]]]) -> bytes:
+        """Write (sheet name, headers, rows) sheets to an XLSX file row by row"""
+        # xlsxwriter serializes large sheets much faster than openpyxl; fall back when it is not installed
+        try:
+            import xlsxwriter
+        except ImportError:
+            xlsxwriter = None
+        
+        output = io.BytesIO()
+        
+        if xlsxwriter:
+            # constant_memory flushes each row as soon as the next one starts
+            workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+            for name, headers, rows in sheets:
+                worksheet = workbook.add_worksheet(name)
+                worksheet.write_row(0, 0, headers)
+                for row_index, row in enumerate(rows, 1):
+                    worksheet.write_row(row_index, 0, row)
+            workbook.close()
+        else:
+            from openpyxl import Workbook
+            
+            workbook = Workbook(write_only=True)
+            for name, headers, rows in sheets:
+                worksheet = workbook.create_sheet(name)
+                worksheet.append(headers)
+                for row in rows:
+                    worksheet.append(row)
+            workbook.save(output)
+        
+        return output.getvalue()
+    
+    def iter_users_csv(self) -> Iterator[bytes]:
+        """Stream users data as CSV chunks"""
+        # One grouped count instead of loading every user's attempts
+        attempt_counts = dict(self.db_manager.session.query(
+            QuizAttempt.user_id, func.count(QuizAttempt.id)
+        ).group_by(QuizAttempt.user_id).all())
+        
+        users = self.db_manager.session.query(
+            User.id,
+            User.telegram_id,
+            User.username,
+            User.first_name,
+            User.last_name,
+            User.email,
+            User.phone_number,
+            User.is_active,
+            User.is_admin,
+            User.created_at,
+            User.last_activity
+        ).order_by(User.created_at.desc()).yield_per(self.CSV_BATCH_SIZE)
+        
+        headers = [
+            'User ID', 'Telegram ID', 'Username', 'First Name', 'Last Name',
+            'Email', 'Phone Number', 'Is Active', 'Is Admin', 'Created At',
+            'Last Activity', 'Total Quiz Attempts'
+        ]
+        
+        def rows():
             for user in users:
-                row = [
+                yield (
                     user.id,
                     user.telegram_id,
                     user.username or '',
@@ -180,51 +289,67 @@ class ExportService:
                     'Yes' if user.is_admin else 'No',
                     user.created_at.isoformat() if user.created_at else '',
                     user.last_activity.isoformat() if user.last_activity else '',
-                    len(user.quiz_attempts)
-                ]
-                writer.writerow(row)
-            
-            csv_content = output.getvalue()
-            output.close()
-            
-            return csv_content.encode('utf-8')
-            
+                    attempt_counts.get(user.id, 0)
+                )
+        
+        return self._csv_chunks(headers, rows())
+    
+    def export_users_csv(self) -> bytes:
+        """Export users data to CSV format"""
+        try:
+            return b''.join(self.iter_users_csv())
         except Exception as e:
             logger.error(f"Failed to export users to CSV: {e}")
             raise
     
-    def export_quizzes_csv(self) -> bytes:
-        """Export quizzes data to CSV format"""
-        try:
-            quizzes = self.db_manager.get_all_quizzes()
-            
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Write header
-            headers = [
-                'Quiz ID', 'Title', 'Description', 'Is Active', 'Time Limit (minutes)',
-                'Max Attempts', 'Passing Score (%)', 'Question Count', 'Total Attempts',
-                'Completed Attempts', 'Average Score (%)', 'Pass Rate (%)',
-                'Created By', 'Created At', 'Updated At'
-            ]
-            writer.writerow(headers)
-            
-            # Write data rows
+    def iter_quizzes_csv(self) -> Iterator[bytes]:
+        """Stream quizzes data as CSV chunks"""
+        # Question counts per quiz
+        question_counts = dict(self.db_manager.session.query(
+            Question.quiz_id, func.count(Question.id)
+        ).group_by(Question.quiz_id).all())
+        
+        # Attempt totals, completions, passes and average score per quiz in one pass
+        is_completed = QuizAttempt.status == 'completed'
+        attempt_stats = {
+            row.quiz_id: row for row in self.db_manager.session.query(
+                QuizAttempt.quiz_id,
+                func.count(QuizAttempt.id).label('total'),
+                func.sum(case((is_completed, 1), else_=0)).label('completed'),
+                func.sum(case((and_(is_completed, QuizAttempt.is_passed == True), 1), else_=0)).label('passed'),
+                func.avg(case((is_completed, QuizAttempt.percentage))).label('average_score')
+            ).group_by(QuizAttempt.quiz_id).all()
+        }
+        
+        quizzes = self.db_manager.session.query(
+            Quiz.id,
+            Quiz.title,
+            Quiz.description,
+            Quiz.is_active,
+            Quiz.time_limit,
+            Quiz.max_attempts,
+            Quiz.passing_score,
+            Quiz.created_by,
+            Quiz.created_at,
+            Quiz.updated_at
+        ).order_by(Quiz.created_at.desc()).yield_per(self.CSV_BATCH_SIZE)
+        
+        headers = [
+            'Quiz ID', 'Title', 'Description', 'Is Active', 'Time Limit (minutes)',
+            'Max Attempts', 'Passing Score (%)', 'Question Count', 'Total Attempts',
+            'Completed Attempts', 'Average Score (%)', 'Pass Rate (%)',
+            'Created By', 'Created At', 'Updated At'
+        ]
+        
+        def rows():
             for quiz in quizzes:
-                completed_attempts = [a for a in quiz.attempts if a.status == 'completed']
-                passed_attempts = [a for a in completed_attempts if a.is_passed]
+                stats = attempt_stats.get(quiz.id)
+                total_attempts = stats.total if stats else 0
+                completed = stats.completed if stats else 0
+                avg_score = float(stats.average_score or 0) if stats else 0
+                pass_rate = (stats.passed / completed) * 100 if completed else 0
                 
-                avg_score = 0
-                if completed_attempts:
-                    scores = [a.percentage for a in completed_attempts if a.percentage is not None]
-                    avg_score = sum(scores) / len(scores) if scores else 0
-                
-                pass_rate = 0
-                if completed_attempts:
-                    pass_rate = (len(passed_attempts) / len(completed_attempts)) * 100
-                
-                row = [
+                yield (
                     quiz.id,
                     quiz.title,
                     quiz.description or '',
@@ -232,22 +357,22 @@ class ExportService:
                     quiz.time_limit // 60 if quiz.time_limit else '',
                     quiz.max_attempts,
                     quiz.passing_score,
-                    len(quiz.questions),
-                    len(quiz.attempts),
-                    len(completed_attempts),
+                    question_counts.get(quiz.id, 0),
+                    total_attempts,
+                    completed,
                     round(avg_score, 2),
                     round(pass_rate, 2),
                     quiz.created_by,
                     quiz.created_at.isoformat() if quiz.created_at else '',
                     quiz.updated_at.isoformat() if quiz.updated_at else ''
-                ]
-                writer.writerow(row)
-            
-            csv_content = output.getvalue()
-            output.close()
-            
-            return csv_content.encode('utf-8')
-            
+                )
+        
+        return self._csv_chunks(headers, rows())
+    
+    def export_quizzes_csv(self) -> bytes:
+        """Export quizzes data to CSV format"""
+        try:
+            return b''.join(self.iter_quizzes_csv())
         except Exception as e:
             logger.error(f"Failed to export quizzes to CSV: {e}")
             raise
@@ -255,66 +380,84 @@ class ExportService:
     def export_analytics_pdf(self, quiz_id: Optional[int] = None) -> bytes:
         """Export analytics report to PDF format"""
         try:
-            output = io.BytesIO()
-            doc = SimpleDocTemplate(output, pagesize=A4)
-            styles = getSampleStyleSheet()
-            story = []
-            
-            # Title
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                spaceAfter=30,
-                alignment=1  # Center alignment
-            )
-            
             if quiz_id:
                 quiz = self.db_manager.get_quiz_by_id(quiz_id)
                 title = f"Quiz Analytics Report: {quiz.title if quiz else 'Unknown'}"
+                # Quiz-specific analytics
+                sections = self._quiz_analytics_sections(self.db_manager.get_quiz_analytics(quiz_id))
             else:
                 title = "System Analytics Report"
+                # System-wide analytics
+                sections = self._system_analytics_sections(self.db_manager.get_system_stats())
             
-            story.append(Paragraph(title, title_style))
-            story.append(Spacer(1, 20))
+            generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')
             
-            # Report metadata
-            meta_style = styles['Normal']
-            story.append(Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}", meta_style))
-            story.append(Spacer(1, 20))
+            if getattr(self.config, 'ANALYTICS_PDF_RENDERER', 'weasyprint') == 'weasyprint':
+                try:
+                    return self._render_pdf_weasyprint(title, generated_at, sections)
+                except (ImportError, OSError) as e:
+                    # Missing package or missing Pango/Cairo system libraries
+                    logger.warning(f"WeasyPrint unavailable, rendering analytics PDF with ReportLab: {e}")
             
-            if quiz_id:
-                # Quiz-specific analytics
-                analytics = self.db_manager.get_quiz_analytics(quiz_id)
-                story.extend(self._create_quiz_analytics_content(analytics, styles))
-            else:
-                # System-wide analytics
-                stats = self.db_manager.get_system_stats()
-                story.extend(self._create_system_analytics_content(stats, styles))
-            
-            # Build PDF
-            doc.build(story)
-            output.seek(0)
-            return output.read()
+            return self._render_pdf_reportlab(title, generated_at, sections)
             
         except Exception as e:
             logger.error(f"Failed to export analytics to PDF: {e}")
             raise
     
-    def _create_quiz_summary(self, quiz: Quiz, attempts: List[QuizAttempt]) -> List[Dict[str, Any]]:
-        """Create summary data for a specific quiz"""
+    def _render_pdf_weasyprint(self, title: str, generated_at: str, sections: List[tuple]) -> bytes:
+        """Lay out the analytics report from its HTML template in one WeasyPrint pass"""
+        from weasyprint import HTML
+        
+        html = _report_templates().get_template('analytics_report.html').render(
+            title=title,
+            generated_at=generated_at,
+            sections=sections
+        )
+        return HTML(string=html).write_pdf()
+    
+    def _render_pdf_reportlab(self, title: str, generated_at: str, sections: List[tuple]) -> bytes:
+        """Build the analytics report as ReportLab flowables"""
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+        
+        styles = _pdf_styles()
+        
+        # Title and report metadata
+        story = [
+            Paragraph(title, styles.title),
+            Spacer(1, 20),
+            Paragraph(f"Generated: {generated_at}", styles.normal),
+            Spacer(1, 20)
+        ]
+        
+        for index, (heading, kind, rows) in enumerate(sections):
+            if index:
+                story.append(Spacer(1, 20))
+            col_widths = [3*inch, 1*inch, 1*inch, 1*inch] if kind == 'question' else None
+            table = Table(rows, colWidths=col_widths)
+            table.setStyle(getattr(styles, f'{kind}_table'))
+            story.extend([Paragraph(heading, styles.section), table])
+        
+        output = io.BytesIO()
+        SimpleDocTemplate(output, pagesize=A4).build(story)
+        return output.getvalue()
+    
+    def _create_quiz_summary(self, quiz: Quiz, attempts: List[Any]) -> List[Tuple[str, Any]]:
+        """Create (metric, value) summary rows for a specific quiz"""
         completed_attempts = [a for a in attempts if a.status == 'completed']
         passed_attempts = [a for a in completed_attempts if a.is_passed]
         
         summary = [
-            {'Metric': 'Quiz Title', 'Value': quiz.title},
-            {'Metric': 'Total Questions', 'Value': len(quiz.questions)},
-            {'Metric': 'Time Limit (minutes)', 'Value': quiz.time_limit // 60 if quiz.time_limit else 'No limit'},
-            {'Metric': 'Passing Score (%)', 'Value': quiz.passing_score},
-            {'Metric': 'Max Attempts', 'Value': quiz.max_attempts},
-            {'Metric': 'Total Attempts', 'Value': len(attempts)},
-            {'Metric': 'Completed Attempts', 'Value': len(completed_attempts)},
-            {'Metric': 'Passed Attempts', 'Value': len(passed_attempts)},
+            ('Quiz Title', quiz.title),
+            ('Total Questions', len(quiz.questions)),
+            ('Time Limit (minutes)', quiz.time_limit // 60 if quiz.time_limit else 'No limit'),
+            ('Passing Score (%)', quiz.passing_score),
+            ('Max Attempts', quiz.max_attempts),
+            ('Total Attempts', len(attempts)),
+            ('Completed Attempts', len(completed_attempts)),
+            ('Passed Attempts', len(passed_attempts))
         ]
         
         if completed_attempts:
@@ -322,209 +465,100 @@ class ExportService:
             times = [a.time_taken for a in completed_attempts if a.time_taken is not None]
             
             summary.extend([
-                {'Metric': 'Average Score (%)', 'Value': round(sum(scores) / len(scores), 2) if scores else 0},
-                {'Metric': 'Pass Rate (%)', 'Value': round((len(passed_attempts) / len(completed_attempts)) * 100, 2)},
-                {'Metric': 'Average Time (minutes)', 'Value': round(sum(times) / len(times) / 60, 2) if times else 0},
+                ('Average Score (%)', round(sum(scores) / len(scores), 2) if scores else 0),
+                ('Pass Rate (%)', round((len(passed_attempts) / len(completed_attempts)) * 100, 2)),
+                ('Average Time (minutes)', round(sum(times) / len(times) / 60, 2) if times else 0)
             ])
         
         return summary
     
-    def _create_question_analysis(self, quiz: Quiz) -> List[Dict[str, Any]]:
-        """Create question-level analysis for a quiz"""
+    def _create_question_analysis(self, quiz: Quiz) -> List[tuple]:
+        """Create question-level analysis rows for a quiz, in QUESTION_ANALYSIS_HEADERS order"""
         analysis = []
         
+        # Answer totals for every question of the quiz in one grouped query
+        answer_counts = {
+            question_id: (total, correct or 0)
+            for question_id, total, correct in self.db_manager.session.query(
+                Answer.question_id,
+                func.count(Answer.id),
+                func.sum(case((Answer.is_correct == True, 1), else_=0))
+            ).join(Question, Question.id == Answer.question_id).filter(
+                Question.quiz_id == quiz.id
+            ).group_by(Answer.question_id).all()
+        }
+        
         for question in quiz.questions:
-            # Get all answers for this question
-            answers = self.db_manager.session.query(Answer).filter(
-                Answer.question_id == question.id
-            ).all()
-            
-            total_answers = len(answers)
-            correct_answers = len([a for a in answers if a.is_correct])
+            total_answers, correct_answers = answer_counts.get(question.id, (0, 0))
             accuracy = (correct_answers / max(total_answers, 1)) * 100
             
-            analysis.append({
-                'Question ID': question.id,
-                'Question Text': question.question_text[:100] + '...' if len(question.question_text) > 100 else question.question_text,
-                'Question Type': question.question_type,
-                'Points': question.points,
-                'Total Answers': total_answers,
-                'Correct Answers': correct_answers,
-                'Accuracy (%)': round(accuracy, 2)
-            })
+            analysis.append((
+                question.id,
+                _truncate(question.question_text, 100),
+                question.question_type,
+                question.points,
+                total_answers,
+                correct_answers,
+                round(accuracy, 2)
+            ))
         
         return analysis
     
-    def _create_quiz_analytics_content(self, analytics: Dict[str, Any], styles) -> List:
-        """Create PDF content for quiz analytics"""
-        story = []
-        
-        # Basic statistics table
-        story.append(Paragraph("Quiz Overview", styles['Heading2']))
-        
-        basic_data = [
-            ['Metric', 'Value'],
-            ['Quiz Title', analytics.get('quiz_title', 'Unknown')],
-            ['Total Attempts', str(analytics.get('total_attempts', 0))],
-            ['Completed Attempts', str(analytics.get('completed_attempts', 0))],
-            ['Completion Rate', f"{analytics.get('completion_rate', 0):.1f}%"],
-            ['Average Score', f"{analytics.get('average_score', 0):.1f}%"],
-            ['Pass Rate', f"{analytics.get('pass_rate', 0):.1f}%"],
-            ['Average Time', f"{analytics.get('average_time', 0):.1f} seconds"]
+    def _quiz_analytics_sections(self, analytics: Dict[str, Any]) -> List[tuple]:
+        """(heading, table kind, rows with the header first) for a quiz analytics report"""
+        sections = [
+            ('Quiz Overview', 'header', [
+                ['Metric', 'Value'],
+                ['Quiz Title', analytics.get('quiz_title', 'Unknown')],
+                ['Total Attempts', str(analytics.get('total_attempts', 0))],
+                ['Completed Attempts', str(analytics.get('completed_attempts', 0))],
+                ['Completion Rate', f"{analytics.get('completion_rate', 0):.1f}%"],
+                ['Average Score', f"{analytics.get('average_score', 0):.1f}%"],
+                ['Pass Rate', f"{analytics.get('pass_rate', 0):.1f}%"],
+                ['Average Time', f"{analytics.get('average_time', 0):.1f} seconds"]
+            ]),
+            ('Score Distribution', 'score', [['Score Range', 'Count']] + [
+                [range_name + '%', str(count)]
+                for range_name, count in analytics.get('score_distribution', {}).items()
+            ])
         ]
         
-        basic_table = Table(basic_data)
-        basic_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(basic_table)
-        story.append(Spacer(1, 20))
-        
-        # Score distribution
-        story.append(Paragraph("Score Distribution", styles['Heading2']))
-        
-        score_dist = analytics.get('score_distribution', {})
-        score_data = [['Score Range', 'Count']]
-        for range_name, count in score_dist.items():
-            score_data.append([range_name + '%', str(count)])
-        
-        score_table = Table(score_data)
-        score_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(score_table)
-        story.append(Spacer(1, 20))
-        
-        # Question analytics
+        # Question analytics, limited to first 10 questions
         question_analytics = analytics.get('question_analytics', [])
         if question_analytics:
-            story.append(Paragraph("Question Analysis", styles['Heading2']))
-            
-            question_data = [['Question', 'Total Answers', 'Correct', 'Accuracy']]
-            for qa in question_analytics[:10]:  # Limit to first 10 questions
-                question_data.append([
-                    qa['question_text'][:50] + '...' if len(qa['question_text']) > 50 else qa['question_text'],
-                    str(qa['total_answers']),
-                    str(qa['correct_answers']),
-                    f"{qa['accuracy']:.1f}%"
-                ])
-            
-            question_table = Table(question_data, colWidths=[3*inch, 1*inch, 1*inch, 1*inch])
-            question_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP')
+            sections.append(('Question Analysis', 'question', [['Question', 'Total Answers', 'Correct', 'Accuracy']] + [
+                [_truncate(qa['question_text'], 50), str(qa['total_answers']), str(qa['correct_answers']), f"{qa['accuracy']:.1f}%"]
+                for qa in question_analytics[:10]
             ]))
-            
-            story.append(question_table)
         
-        return story
+        return sections
     
-    def _create_system_analytics_content(self, stats: Dict[str, Any], styles) -> List:
-        """Create PDF content for system analytics"""
-        story = []
-        
-        # System overview
-        story.append(Paragraph("System Overview", styles['Heading2']))
-        
-        system_data = [
-            ['Metric', 'Value'],
-            ['Total Users', str(stats.get('total_users', 0))],
-            ['Active Users', str(stats.get('active_users', 0))],
-            ['New Users (7 days)', str(stats.get('new_users_week', 0))],
-            ['New Users (30 days)', str(stats.get('new_users_month', 0))],
-            ['Total Quizzes', str(stats.get('total_quizzes', 0))],
-            ['Active Quizzes', str(stats.get('active_quizzes', 0))],
-            ['Total Questions', str(stats.get('total_questions', 0))]
-        ]
-        
-        system_table = Table(system_data)
-        system_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(system_table)
-        story.append(Spacer(1, 20))
-        
-        # Performance metrics
-        story.append(Paragraph("Performance Metrics", styles['Heading2']))
-        
-        performance_data = [
-            ['Metric', 'Value'],
-            ['Total Attempts', str(stats.get('total_attempts', 0))],
-            ['Completed Attempts', str(stats.get('completed_attempts', 0))],
-            ['Attempts Today', str(stats.get('attempts_today', 0))],
-            ['Attempts This Week', str(stats.get('attempts_week', 0))],
-            ['Average Score', f"{stats.get('average_score', 0):.1f}%"],
-            ['Pass Rate', f"{stats.get('pass_rate', 0):.1f}%"],
-            ['Most Popular Quiz', str(stats.get('most_popular_quiz', 'None'))]
-        ]
-        
-        performance_table = Table(performance_data)
-        performance_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(performance_table)
-        story.append(Spacer(1, 20))
-        
-        # System information
-        story.append(Paragraph("System Information", styles['Heading2']))
-        
-        system_info_data = [
-            ['Metric', 'Value'],
-            ['Database Size', str(stats.get('db_size', 'Unknown'))],
-            ['Last Backup', str(stats.get('last_backup', 'Never'))]
+    def _system_analytics_sections(self, stats: Dict[str, Any]) -> List[tuple]:
+        """(heading, table kind, rows with the header first) for the system analytics report"""
+        return [
+            ('System Overview', 'header', [
+                ['Metric', 'Value'],
+                ['Total Users', str(stats.get('total_users', 0))],
+                ['Active Users', str(stats.get('active_users', 0))],
+                ['New Users (7 days)', str(stats.get('new_users_week', 0))],
+                ['New Users (30 days)', str(stats.get('new_users_month', 0))],
+                ['Total Quizzes', str(stats.get('total_quizzes', 0))],
+                ['Active Quizzes', str(stats.get('active_quizzes', 0))],
+                ['Total Questions', str(stats.get('total_questions', 0))]
+            ]),
+            ('Performance Metrics', 'header', [
+                ['Metric', 'Value'],
+                ['Total Attempts', str(stats.get('total_attempts', 0))],
+                ['Completed Attempts', str(stats.get('completed_attempts', 0))],
+                ['Attempts Today', str(stats.get('attempts_today', 0))],
+                ['Attempts This Week', str(stats.get('attempts_week', 0))],
+                ['Average Score', f"{stats.get('average_score', 0):.1f}%"],
+                ['Pass Rate', f"{stats.get('pass_rate', 0):.1f}%"],
+                ['Most Popular Quiz', str(stats.get('most_popular_quiz', 'None'))]
+            ]),
+            ('System Information', 'header', [
+                ['Metric', 'Value'],
+                ['Database Size', str(stats.get('db_size', 'Unknown'))],
+                ['Last Backup', str(stats.get('last_backup', 'Never'))]
+            ])
         ]
-        
-        system_info_table = Table(system_info_data)
-        system_info_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(system_info_table)
-        
-        return story
\ No newline at end of file
@@ -1,86 +1,251 @@
 import logging
 import hashlib
-import secrets
 import hmac
 import base64
+import json
+import os
 import re
-from datetime import datetime, timedelta
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
 from typing import Optional, Dict, Any, List
-from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import jwt
-from functools import wraps
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from functools import lru_cache, wraps
 
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Characters stripped from user input by sanitize_input
+_SANITIZE_TABLE = str.maketrans('', '', '<>"\'/\\')
+
+# Precompiled validation patterns
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_NON_DIGIT_RE = re.compile(r'\D')
+_TG_USERNAME_RE = re.compile(r'^[a-zA-Z0-9_]{5,32}$')
+
+# File upload rules
+_ALLOWED_UPLOAD_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.pdf', '.doc', '.docx', '.txt'})
+_ALLOWED_UPLOAD_CONTENT_TYPES = frozenset({
+    'image/jpeg', 'image/png', 'image/gif',
+    'application/pdf', 'application/msword',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'text/plain'
+})
+_DANGEROUS_FILENAME_RE = re.compile(r'\.\./|\.\.\\|<script|<\?php|<%', re.IGNORECASE)
+
+# Base64url of the fixed {"alg":"HS256","typ":"JWT"} header used by generate_token
+_JWT_HEADER_B64 = b'eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9'
+
+# Derived encryption keys per (secret, salt, iterations), shared by every SecurityManager in the process
+_KEY_CACHE: Dict[bytes, bytes] = {}
+
+def _check_sha256_backend():
+    """Warn when hashlib.sha256 is CPython's builtin fallback rather than OpenSSL's"""
+    openssl = getattr(hashlib, '_hashlib', None)
+    if openssl is None or hashlib.sha256 is not getattr(openssl, 'openssl_sha256', None):
+        logger.warning(
+            "hashlib.sha256 is not backed by OpenSSL; SHA-NI acceleration is unavailable. "
+            "Rebuild Python against OpenSSL >= 1.1.1 for hardware-accelerated SHA-256"
+        )
+
+_check_sha256_backend()
+
+def _urlsafe_token(nbytes: int) -> str:
+    """URL-safe random token straight from os.urandom"""
+    return base64.urlsafe_b64encode(os.urandom(nbytes)).rstrip(b'=').decode('ascii')
+
+@lru_cache(maxsize=4)
+def _webhook_secret(token: str) -> bytes:
+    """HMAC key for webhook signatures derived from a bot token"""
+    return hashlib.sha256(token.encode()).digest()
+
+@lru_cache(maxsize=1024)
+def validate_email(email: str) -> bool:
+    """Validate email format"""
+    return bool(_EMAIL_RE.match(email))
+
+@lru_cache(maxsize=1024)
+def validate_phone(phone: str) -> bool:
+    """Validate phone number format"""
+    # Remove all non-digit characters
+    digits_only = _NON_DIGIT_RE.sub('', phone)
+    
+    # Check if it's a valid length (7-15 digits)
+    return 7 <= len(digits_only) <= 15
+
+@lru_cache(maxsize=1024)
+def validate_telegram_username(username: str) -> bool:
+    """Validate Telegram username format"""
+    if not username:
+        return True  # Username is optional
+    
+    # Remove @ if present
+    username = username.lstrip('@')
+    
+    # Telegram username rules: 5-32 characters, alphanumeric + underscore
+    return bool(_TG_USERNAME_RE.match(username))
+
 class SecurityManager:
     """Security utilities for the Telegram Quiz Bot"""
     
+    __slots__ = ('config', 'secret_key', 'jwt_secret', 'jwt_key', 'encryption_key', 'aead', 'password_hasher', '_token_cache')
+    
+    # AES-GCM nonce length in bytes, prepended to every ciphertext
+    NONCE_SIZE = 12
+    
+    # Verified token payloads kept for repeat lookups; entries never outlive the token's exp
+    TOKEN_CACHE_SIZE = 10000
+    TOKEN_CACHE_TTL = 5
+    
     def __init__(self, config: Config):
         self.config = config
         self.secret_key = config.SECRET_KEY
         self.jwt_secret = config.JWT_SECRET_KEY
+        self.jwt_key = self.jwt_secret.encode()
         self.encryption_key = self._derive_encryption_key()
-        self.cipher_suite = Fernet(self.encryption_key)
+        self.aead = AESGCM(self.encryption_key)
+        self.password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2)
+        self._token_cache: OrderedDict = OrderedDict()
     
     def _derive_encryption_key(self) -> bytes:
-        """Derive encryption key from secret key"""
+        """Derive a raw 256-bit encryption key from secret key"""
         password = self.secret_key.encode()
         salt = b'telegram_quiz_bot_salt'  # In production, use a random salt stored securely
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password))
+        iterations = getattr(self.config, 'PBKDF2_ITERATIONS', 100000)
+        cache_key = hashlib.sha256(password + salt + str(iterations).encode()).digest()
+        
+        key = _KEY_CACHE.get(cache_key)
+        if key is None:
+            key = self._load_cached_key(cache_key, password)
+            if key is None:
+                kdf = PBKDF2HMAC(
+                    algorithm=hashes.SHA256(),
+                    length=32,
+                    salt=salt,
+                    iterations=iterations,
+                )
+                key = kdf.derive(password)
+                self._store_cached_key(cache_key, password, key)
+            _KEY_CACHE[cache_key] = key
+        return key
+    
+    def _key_cache_path(self, cache_key: bytes) -> str:
+        """Path of the on-disk cache file for a derived key"""
+        cache_dir = getattr(self.config, 'KEY_CACHE_DIR', os.path.expanduser('~/.cache/qtb'))
+        return os.path.join(cache_dir, f"key-{cache_key.hex()[:16]}.bin")
+    
+    def _load_cached_key(self, cache_key: bytes, password: bytes) -> Optional[bytes]:
+        """Load a derived key from disk if its HMAC tag matches the secret key"""
+        try:
+            with open(self._key_cache_path(cache_key), 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None
+        
+        key, tag = content[:32], content[32:]
+        expected_tag = hmac.new(password, cache_key + key, hashlib.sha256).digest()
+        if len(key) != 32 or not hmac.compare_digest(tag, expected_tag):
+            logger.warning("Ignoring invalid cached encryption key")
+            return None
         return key
     
+    def _store_cached_key(self, cache_key: bytes, password: bytes, key: bytes):
+        """Write a derived key to disk, readable by the owner only"""
+        path = self._key_cache_path(cache_key)
+        tag = hmac.new(password, cache_key + key, hashlib.sha256).digest()
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(key + tag)
+        except OSError as e:
+            logger.warning(f"Failed to cache encryption key: {e}")
+    
     def hash_password(self, password: str) -> str:
-        """Hash a password using SHA-256 with salt"""
-        salt = secrets.token_hex(16)
-        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        return f"{salt}:{password_hash}"
+        """Hash a password using Argon2id"""
+        return self.password_hasher.hash(password)
     
     def verify_password(self, password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
+        if hashed_password.startswith('$argon2'):
+            try:
+                return self.password_hasher.verify(hashed_password, password)
+            except (VerificationError, InvalidHashError):
+                return False
+        
         try:
-            salt, stored_hash = hashed_password.split(':')
-            password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
+            parts = hashed_password.split(':')
+            if len(parts) == 3 and parts[0] == 'b2':
+                # Legacy BLAKE2b hashes stored as b2:salt:hash
+                _, salt, stored_hash = parts
+                password_hash = hashlib.blake2b(
+                    password.encode(), salt=bytes.fromhex(salt), digest_size=32, person=b'qtb-pw'
+                ).hexdigest()
+            else:
+                # Legacy SHA-256 hashes stored as salt:hash
+                salt, stored_hash = parts
+                password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
             return hmac.compare_digest(password_hash, stored_hash)
         except ValueError:
             return False
     
     def generate_token(self, user_id: int, telegram_id: int, expires_hours: int = 24) -> str:
         """Generate JWT token for user authentication"""
+        now = int(time.time())
         payload = {
             'user_id': user_id,
             'telegram_id': telegram_id,
-            'exp': datetime.utcnow() + timedelta(hours=expires_hours),
-            'iat': datetime.utcnow()
+            'exp': now + expires_hours * 3600,
+            'iat': now
         }
-        return jwt.encode(payload, self.jwt_secret, algorithm='HS256')
+        
+        # HS256 with a fixed header needs only one HMAC, so sign directly instead of through PyJWT
+        payload_b64 = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).rstrip(b'=')
+        signing_input = _JWT_HEADER_B64 + b'.' + payload_b64
+        signature = hmac.new(self.jwt_key, signing_input, hashlib.sha256).digest()
+        return (signing_input + b'.' + base64.urlsafe_b64encode(signature).rstrip(b'=')).decode('ascii')
     
     def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Verify JWT token and return payload"""
+        # Keyed BLAKE2b accepts at most 64 key bytes
+        cache_key = hashlib.blake2b(token.encode(), digest_size=16, key=self.jwt_key[:64]).digest()
+        now = time.time()
+        
+        cached = self._token_cache.get(cache_key)
+        if cached is not None:
+            payload, expires_at = cached
+            if now < expires_at:
+                self._token_cache.move_to_end(cache_key)
+                return payload
+            self._token_cache.pop(cache_key, None)
+        
         try:
             payload = jwt.decode(token, self.jwt_secret, algorithms=['HS256'])
-            return payload
         except jwt.ExpiredSignatureError:
             logger.warning("Token has expired")
             return None
         except jwt.InvalidTokenError:
             logger.warning("Invalid token")
             return None
+        
+        expires_at = min(payload.get('exp', now), now + self.TOKEN_CACHE_TTL)
+        self._token_cache[cache_key] = (payload, expires_at)
+        if len(self._token_cache) > self.TOKEN_CACHE_SIZE:
+            self._token_cache.popitem(last=False)
+        return payload
     
     def encrypt_data(self, data: str) -> str:
         """Encrypt sensitive data"""
         try:
-            encrypted_data = self.cipher_suite.encrypt(data.encode())
-            return base64.urlsafe_b64encode(encrypted_data).decode()
+            nonce = os.urandom(self.NONCE_SIZE)
+            encrypted_data = self.aead.encrypt(nonce, data.encode(), None)
+            return base64.urlsafe_b64encode(nonce + encrypted_data).decode()
         except Exception as e:
             logger.error(f"Failed to encrypt data: {e}")
             raise
@@ -89,7 +254,8 @@ class SecurityManager:
         """Decrypt sensitive data"""
         try:
             encrypted_bytes = base64.urlsafe_b64decode(encrypted_data.encode())
-            decrypted_data = self.cipher_suite.decrypt(encrypted_bytes)
+            nonce, ciphertext = encrypted_bytes[:self.NONCE_SIZE], encrypted_bytes[self.NONCE_SIZE:]
+            decrypted_data = self.aead.decrypt(nonce, ciphertext, None)
             return decrypted_data.decode()
         except Exception as e:
             logger.error(f"Failed to decrypt data: {e}")
@@ -97,17 +263,20 @@ class SecurityManager:
     
     def generate_api_key(self, length: int = 32) -> str:
         """Generate a secure API key"""
-        return secrets.token_urlsafe(length)
+        return _urlsafe_token(length)
     
     def verify_telegram_webhook(self, token: str, data: str, signature: str) -> bool:
         """Verify Telegram webhook signature"""
-        secret_key = hashlib.sha256(token.encode()).digest()
+        try:
+            signature_bytes = bytes.fromhex(signature)
+        except ValueError:
+            return False
         expected_signature = hmac.new(
-            secret_key,
+            _webhook_secret(token),
             data.encode(),
             hashlib.sha256
-        ).hexdigest()
-        return hmac.compare_digest(signature, expected_signature)
+        ).digest()
+        return hmac.compare_digest(signature_bytes, expected_signature)
     
     def sanitize_input(self, text: str, max_length: int = 1000) -> str:
         """Sanitize user input to prevent injection attacks"""
@@ -115,7 +284,7 @@ class SecurityManager:
             return ""
         
         # Remove potentially dangerous characters
-        sanitized = re.sub(r'[<>"\'\/\\]', '', text)
+        sanitized = text.translate(_SANITIZE_TABLE)
         
         # Limit length
         sanitized = sanitized[:max_length]
@@ -127,28 +296,15 @@ class SecurityManager:
     
     def validate_email(self, email: str) -> bool:
         """Validate email format"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        return validate_email(email)
     
     def validate_phone(self, phone: str) -> bool:
         """Validate phone number format"""
-        # Remove all non-digit characters
-        digits_only = re.sub(r'\D', '', phone)
-        
-        # Check if it's a valid length (7-15 digits)
-        return 7 <= len(digits_only) <= 15
+        return validate_phone(phone)
     
     def validate_telegram_username(self, username: str) -> bool:
         """Validate Telegram username format"""
-        if not username:
-            return True  # Username is optional
-        
-        # Remove @ if present
-        username = username.lstrip('@')
-        
-        # Telegram username rules: 5-32 characters, alphanumeric + underscore
-        pattern = r'^[a-zA-Z0-9_]{5,32}$'
-        return bool(re.match(pattern, username))
+        return validate_telegram_username(username)
     
     def rate_limit_key(self, user_id: int, action: str) -> str:
         """Generate rate limiting key"""
@@ -156,14 +312,14 @@ class SecurityManager:
     
     def generate_session_id(self) -> str:
         """Generate a secure session ID"""
-        return secrets.token_urlsafe(32)
+        return _urlsafe_token(32)
     
     def mask_sensitive_data(self, data: str, mask_char: str = '*', visible_chars: int = 4) -> str:
         """Mask sensitive data for logging"""
         if not data or len(data) <= visible_chars:
             return mask_char * len(data) if data else ""
         
-        return data[:visible_chars] + mask_char * (len(data) - visible_chars)
+        return data[:visible_chars].ljust(len(data), mask_char)
     
     def validate_file_upload(self, filename: str, content_type: str, file_size: int) -> Dict[str, Any]:
         """Validate file upload security"""
@@ -179,39 +335,29 @@ class SecurityManager:
             result['errors'].append(f"File size exceeds maximum allowed size of {max_size} bytes")
         
         # Check file extension
-        allowed_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.pdf', '.doc', '.docx', '.txt'}
-        file_ext = '.' + filename.split('.')[-1].lower() if '.' in filename else ''
+        file_ext = os.path.splitext(filename)[1].lower()
         
-        if file_ext not in allowed_extensions:
+        if file_ext not in _ALLOWED_UPLOAD_EXTENSIONS:
             result['valid'] = False
             result['errors'].append(f"File type '{file_ext}' is not allowed")
         
         # Check content type
-        allowed_content_types = {
-            'image/jpeg', 'image/png', 'image/gif',
-            'application/pdf', 'application/msword',
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            'text/plain'
-        }
-        
-        if content_type not in allowed_content_types:
+        if content_type not in _ALLOWED_UPLOAD_CONTENT_TYPES:
             result['valid'] = False
             result['errors'].append(f"Content type '{content_type}' is not allowed")
         
         # Check filename for dangerous patterns
-        dangerous_patterns = ['../', '..\\', '<script', '<?php', '<%']
-        filename_lower = filename.lower()
-        
-        for pattern in dangerous_patterns:
-            if pattern in filename_lower:
-                result['valid'] = False
-                result['errors'].append("Filename contains dangerous patterns")
-                break
+        if _DANGEROUS_FILENAME_RE.search(filename):
+            result['valid'] = False
+            result['errors'].append("Filename contains dangerous patterns")
         
         return result
     
     def log_security_event(self, event_type: str, user_id: Optional[int], details: Dict[str, Any]):
         """Log security-related events"""
+        if not logger.isEnabledFor(logging.WARNING):
+            return
+        
         log_data = {
             'timestamp': datetime.utcnow().isoformat(),
             'event_type': event_type,
@@ -221,11 +367,16 @@ class SecurityManager:
         
         # In a production environment, you might want to send this to a
         # security monitoring system or dedicated security log
-        logger.warning(f"Security Event: {log_data}")
+        logger.warning(
+            "Security Event: %s", log_data,
+            extra={'event_type': event_type, 'user_id': user_id, 'details': details}
+        )
 
 class AdminRequired:
     """Decorator for admin-only functions"""
     
+    __slots__ = ('security_manager',)
+    
     def __init__(self, security_manager: SecurityManager):
         self.security_manager = security_manager
     
@@ -240,26 +391,24 @@ class AdminRequired:
 class RateLimiter:
     """Simple in-memory rate limiter"""
     
+    __slots__ = ('requests',)
+    
     def __init__(self):
-        self.requests = {}
+        self.requests: Dict[str, deque] = {}
     
     def is_allowed(self, key: str, limit: int, window_seconds: int) -> bool:
         """Check if request is allowed under rate limit"""
-        now = datetime.utcnow()
+        now = time.monotonic_ns()
+        requests = self.requests.setdefault(key, deque())
         
-        if key not in self.requests:
-            self.requests[key] = []
-        
-        # Remove old requests outside the window
-        cutoff = now - timedelta(seconds=window_seconds)
-        self.requests[key] = [
-            req_time for req_time in self.requests[key]
-            if req_time > cutoff
-        ]
+        # Drop old requests outside the window; timestamps are appended in order
+        cutoff = now - window_seconds * 1_000_000_000
+        while requests and requests[0] <= cutoff:
+            requests.popleft()
         
         # Check if under limit
-        if len(self.requests[key]) < limit:
-            self.requests[key].append(now)
+        if len(requests) < limit:
+            requests.append(now)
             return True
         
         return False
@@ -272,18 +421,22 @@ class RateLimiter:
 class InputValidator:
     """Input validation utilities"""
     
+    __slots__ = ()
+    
     @staticmethod
     def validate_quiz_title(title: str) -> Dict[str, Any]:
         """Validate quiz title"""
         result = {'valid': True, 'errors': []}
         
-        if not title or not title.strip():
+        length = len(title.strip()) if title else 0
+        
+        if length == 0:
             result['valid'] = False
             result['errors'].append("Title is required")
-        elif len(title.strip()) < 3:
+        elif length < 3:
             result['valid'] = False
             result['errors'].append("Title must be at least 3 characters long")
-        elif len(title.strip()) > 200:
+        elif length > 200:
             result['valid'] = False
             result['errors'].append("Title must be less than 200 characters")
         
@@ -294,13 +447,15 @@ class InputValidator:
         """Validate question text"""
         result = {'valid': True, 'errors': []}
         
-        if not text or not text.strip():
+        length = len(text.strip()) if text else 0
+        
+        if length == 0:
             result['valid'] = False
             result['errors'].append("Question text is required")
-        elif len(text.strip()) < 5:
+        elif length < 5:
             result['valid'] = False
             result['errors'].append("Question text must be at least 5 characters long")
-        elif len(text.strip()) > 1000:
+        elif length > 1000:
             result['valid'] = False
             result['errors'].append("Question text must be less than 1000 characters")
         
@@ -355,8 +510,8 @@ def require_admin(func):
         
         # Check if user is admin (this would typically check against database)
         # For now, we'll check against config admin list
-        if hasattr(context.bot_data, 'config'):
-            admin_ids = getattr(context.bot_data['config'], 'ADMIN_USER_IDS', [])
+        if 'config' in context.bot_data:
+            admin_ids = getattr(context.bot_data['config'], 'ADMIN_CHAT_IDS', frozenset())
             if user_id not in admin_ids:
                 update.message.reply_text("❌ Access denied. Admin privileges required.")
                 return
@@ -367,10 +522,13 @@ def require_admin(func):
 def rate_limit(limit: int, window_seconds: int = 60):
     """Decorator to apply rate limiting"""
     def decorator(func):
+        # The handler part of the key is fixed per decoration
+        key_suffix = f":{func.__name__}"
+        
         @wraps(func)
         def wrapper(update, context, *args, **kwargs):
             user_id = update.effective_user.id
-            key = f"user:{user_id}:{func.__name__}"
+            key = f"user:{user_id}{key_suffix}"
             
             if not rate_limiter.is_allowed(key, limit, window_seconds):
                 update.message.reply_text(
@@ -1,11 +1,31 @@
+import os
+
+# Cooperative I/O when the dashboard runs standalone under gevent; must patch before anything else imports
+if os.environ.get('GEVENT'):
+    from gevent import monkey
+    monkey.patch_all()
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
 import logging
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, send_file
+from flask import Flask, Response, make_response, render_template, request, jsonify, redirect, url_for, flash, session, send_file, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import check_password_hash, generate_password_hash
 from functools import wraps
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import joinedload, selectinload
+import decimal
+import hashlib
 import io
 import json
+import orjson
+import re
+import sys
+import time
+from types import SimpleNamespace
 from typing import Dict, Any, List, Optional
 
 from config import Config, DevelopmentConfig, ProductionConfig
@@ -18,8 +38,28 @@ from utils.security import SecurityManager
 
 logger = logging.getLogger(__name__)
 
+def _json_default(obj):
+    """Serialize the types orjson does not handle natively"""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson"""
+    
+    OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=_json_default, option=self.OPTIONS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Flask app setup
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Configuration
 if app.config.get('ENVIRONMENT') == 'production':
@@ -29,6 +69,12 @@ else:
 
 app.config.from_object(config)
 
+# Compiled templates persist on disk, so restarted workers skip parsing them again
+jinja_cache_dir = getattr(config, 'JINJA_CACHE_DIR', None)
+if jinja_cache_dir:
+    os.makedirs(jinja_cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(jinja_cache_dir)
+
 # Initialize extensions
 db.init_app(app)
 login_manager = LoginManager()
@@ -43,6 +89,9 @@ export_service = ExportService(config)
 backup_service = BackupService(config)
 security_manager = SecurityManager(config)
 
+# Seconds the admin fields cached in the signed session are trusted before reloading from the database
+USER_CACHE_TTL = 300
+
 class WebAdminUser(UserMixin):
     """User class for Flask-Login"""
     
@@ -53,14 +102,58 @@ class WebAdminUser(UserMixin):
         self.is_active = admin_user.is_active
         self.is_super_admin = admin_user.is_super_admin
         self.last_login = admin_user.last_login
+    
+    def to_cache(self) -> Dict[str, Any]:
+        """Session-serializable copy of the fields, stamped with the current time"""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'is_active': self.is_active,
+            'is_super_admin': self.is_super_admin,
+            'last_login_ts': self.last_login.timestamp() if self.last_login else None,
+            'stamp': time.time()
+        }
+    
+    @classmethod
+    def from_cache(cls, data: Dict[str, Any]) -> 'WebAdminUser':
+        """Rebuild a user from to_cache() output"""
+        last_login_ts = data['last_login_ts']
+        return cls(SimpleNamespace(
+            **{key: data[key] for key in ('id', 'username', 'email', 'is_active', 'is_super_admin')},
+            last_login=datetime.fromtimestamp(last_login_ts) if last_login_ts is not None else None
+        ))
+
+def flush_user_cache():
+    """Drop the admin fields cached in the current session"""
+    session.pop('user_cache', None)
 
 @login_manager.user_loader
 def load_user(user_id):
+    cached = session.get('user_cache')
+    if cached and cached['id'] == int(user_id) and time.time() - cached['stamp'] < USER_CACHE_TTL:
+        return WebAdminUser.from_cache(cached)
+    
     admin_user = db_manager.get_admin_user_by_id(int(user_id))
     if admin_user:
-        return WebAdminUser(admin_user)
+        web_user = WebAdminUser(admin_user)
+        session['user_cache'] = web_user.to_cache()
+        return web_user
+    flush_user_cache()
     return None
 
+# Hash verified for unknown usernames, so login timing does not reveal which admins exist
+DUMMY_PASSWORD_HASH = security_manager.hash_password(os.urandom(16).hex())
+
+def verify_password_offloaded(password: str, password_hash: str) -> bool:
+    """Verify a password on a native thread when gevent is active, so the hashing does not stall other greenlets"""
+    if 'gevent' in sys.modules:
+        from gevent import get_hub
+        from gevent.monkey import is_module_patched
+        if is_module_patched('threading'):
+            return get_hub().threadpool.apply(security_manager.verify_password, (password, password_hash))
+    return security_manager.verify_password(password, password_hash)
+
 def admin_required(f):
     """Decorator to require admin login"""
     @wraps(f)
@@ -80,6 +173,64 @@ def super_admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def keyset_page(query, per_page: int):
+    """Fetch one page of an already ordered and cursor-filtered query"""
+    # One extra row tells whether another page follows, without a COUNT(*)
+    rows = query.limit(per_page + 1).all()
+    return rows[:per_page], len(rows) > per_page
+
+def user_attempts_page(user_id: int, after_id: Optional[int] = None, per_page: int = 50):
+    """One keyset page of a user's attempts, newest first, with their quizzes loaded"""
+    query = db_manager.session.query(QuizAttempt).options(
+        selectinload(QuizAttempt.quiz)
+    ).filter(QuizAttempt.user_id == user_id)
+    if after_id:
+        query = query.filter(QuizAttempt.id < after_id)
+    return keyset_page(query.order_by(QuizAttempt.id.desc()), per_page)
+
+# Minutes analytics time ranges are snapped to, and how long browsers may reuse those responses
+ANALYTICS_BUCKET_MINUTES = 5
+ANALYTICS_MAX_AGE = ANALYTICS_BUCKET_MINUTES * 60
+
+def analytics_bucket(now: Optional[datetime] = None) -> datetime:
+    """Current (or the given) time rounded down to an ANALYTICS_BUCKET_MINUTES boundary"""
+    now = (now or datetime.utcnow()).replace(second=0, microsecond=0)
+    return now - timedelta(minutes=now.minute % ANALYTICS_BUCKET_MINUTES)
+
+def conditional_response(build, *key, max_age: int = 0):
+    """Serve build() with an ETag of the key, answering 304 without building on a match"""
+    etag = hashlib.md5(repr(key).encode()).hexdigest()
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = make_response(build())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f'private, max-age={max_age}' if max_age else 'private, no-cache'
+    return response
+
+def bucketed_response(build, *key):
+    """conditional_response keyed on the current analytics bucket, reusable until the bucket ends"""
+    now = datetime.utcnow()
+    bucket = analytics_bucket(now)
+    # Only the rest of the bucket, so a response from its last seconds is not reused through the next one
+    remaining = max(0, int(ANALYTICS_MAX_AGE - (now - bucket).total_seconds()))
+    return conditional_response(build, *key, bucket, max_age=remaining)
+
+def user_search_tsquery(search: str) -> Optional[str]:
+    """Turn free-text search into a tsquery matching every word as a prefix, so partial names still match"""
+    words = [word for word in search.split() if re.search(r'\w', word)]
+    if not words:
+        return None
+    # Quoted so punctuation such as '@' in emails is handed to the parser rather than read as tsquery syntax
+    return ' & '.join(
+        "'" + word.replace('\\', '\\\\').replace("'", "''") + "':*" for word in words
+    )
+
+@app.teardown_appcontext
+def remove_db_session(exception=None):
+    """Release the request's database session"""
+    db_manager.close_session()
+
 # Routes
 @app.route('/')
 def index():
@@ -104,10 +255,15 @@ def login():
         
         admin_user = db_manager.get_admin_user_by_username(username)
         
-        if admin_user and security_manager.verify_password(password, admin_user.password_hash):
+        # Unknown usernames are checked against a dummy hash so they take as long as wrong passwords
+        password_ok = verify_password_offloaded(
+            password, admin_user.password_hash if admin_user else DUMMY_PASSWORD_HASH
+        )
+        if admin_user and password_ok:
             if admin_user.is_active:
                 web_user = WebAdminUser(admin_user)
                 login_user(web_user)
+                session['user_cache'] = web_user.to_cache()
                 
                 # Update last login
                 db_manager.update_admin_last_login(admin_user.id)
@@ -141,6 +297,7 @@ def logout():
     """Admin logout"""
     username = current_user.username
     logout_user()
+    flush_user_cache()
     
     # Log logout event
     db_manager.log_system_event(
@@ -155,63 +312,30 @@ def logout():
 @app.route('/dashboard')
 @admin_required
 def dashboard():
-    """Main dashboard"""
-    try:
-        # Get system statistics
-        stats = db_manager.get_system_stats()
-        
-        # Get recent activity
-        recent_attempts = db_manager.session.query(QuizAttempt).filter(
-            QuizAttempt.status == 'completed'
-        ).order_by(QuizAttempt.completed_at.desc()).limit(10).all()
-        
-        # Get recent logs
-        recent_logs = db_manager.session.query(SystemLog).order_by(
-            SystemLog.created_at.desc()
-        ).limit(20).all()
-        
-        # Get quiz performance data
-        quiz_performance = []
-        quizzes = db_manager.get_all_quizzes()
-        
-        for quiz in quizzes[:10]:  # Top 10 quizzes
-            analytics = db_manager.get_quiz_analytics(quiz.id)
-            quiz_performance.append({
-                'quiz': quiz,
-                'analytics': analytics
-            })
-        
-        return render_template('dashboard.html',
-                             stats=stats,
-                             recent_attempts=recent_attempts,
-                             recent_logs=recent_logs,
-                             quiz_performance=quiz_performance)
-    
-    except Exception as e:
-        logger.error(f"Dashboard error: {e}")
-        flash('Error loading dashboard data.', 'error')
-        return render_template('dashboard.html', stats={}, recent_attempts=[], recent_logs=[])
+    """Main dashboard shell; the browser fills each tile from its API endpoint in parallel"""
+    return render_template('dashboard.html', tiles={
+        'stats': url_for('api_stats'),
+        'recent_attempts': url_for('api_recent_attempts'),
+        'recent_logs': url_for('api_recent_logs'),
+        'top_quizzes': url_for('api_top_quizzes')
+    })
 
 @app.route('/users')
 @admin_required
 def users():
     """User management page"""
     try:
-        page = request.args.get('page', 1, type=int)
+        after_id = request.args.get('after_id', type=int)
         per_page = 20
         
         users_query = db_manager.session.query(User)
         
         # Search filter
         search = request.args.get('search')
-        if search:
+        search_query = user_search_tsquery(search) if search else None
+        if search_query:
             users_query = users_query.filter(
-                db.or_(
-                    User.first_name.ilike(f'%{search}%'),
-                    User.last_name.ilike(f'%{search}%'),
-                    User.username.ilike(f'%{search}%'),
-                    User.email.ilike(f'%{search}%')
-                )
+                User.search_tsv.op('@@')(func.to_tsquery('simple', search_query))
             )
         
         # Status filter
@@ -221,58 +345,92 @@ def users():
         elif status == 'inactive':
             users_query = users_query.filter(User.is_active == False)
         
-        users_pagination = users_query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # Keyset pagination on the primary key: the next page starts below the last id shown
+        if after_id:
+            users_query = users_query.filter(User.id < after_id)
+        users_page, has_more = keyset_page(users_query.order_by(User.id.desc()), per_page)
+        next_after_id = users_page[-1].id if has_more else None
         
         return render_template('users.html',
-                             users=users_pagination.items,
-                             pagination=users_pagination,
+                             users=users_page,
+                             next_after_id=next_after_id,
                              search=search,
                              status=status)
     
     except Exception as e:
         logger.error(f"Users page error: {e}")
         flash('Error loading users data.', 'error')
-        return render_template('users.html', users=[], pagination=None)
+        return render_template('users.html', users=[], next_after_id=None)
 
 @app.route('/users/<int:user_id>')
 @admin_required
 def user_detail(user_id):
     """User detail page"""
     try:
-        user = db_manager.get_user_by_id(user_id)
-        if not user:
+        version = db_manager.get_user_version(user_id)
+        if not version:
             flash('User not found.', 'error')
             return redirect(url_for('users'))
         
-        # Get user's quiz attempts
-        attempts = db_manager.session.query(QuizAttempt).filter(
-            QuizAttempt.user_id == user_id
-        ).order_by(QuizAttempt.created_at.desc()).all()
+        def build():
+            user = db_manager.get_user_by_id(user_id)
+            
+            # Get the user's latest quiz attempts; older ones load through user_attempts()
+            attempts, has_more = user_attempts_page(user_id)
+            next_cursor = attempts[-1].id if has_more else None
+            
+            return render_template('user_detail.html', user=user, attempts=attempts, next_cursor=next_cursor)
         
-        return render_template('user_detail.html', user=user, attempts=attempts)
+        # Revalidated on every load; unchanged users answer 304 after the one version query
+        return conditional_response(build, 'user', user_id, *version)
     
     except Exception as e:
         logger.error(f"User detail error: {e}")
         flash('Error loading user details.', 'error')
         return redirect(url_for('users'))
 
+@app.route('/users/<int:user_id>/attempts')
+@admin_required
+def user_attempts(user_id):
+    """JSON page of a user's quiz attempts older than ?after=<attempt id>"""
+    try:
+        attempts, has_more = user_attempts_page(user_id, request.args.get('after', type=int))
+        return jsonify({
+            'attempts': [
+                {
+                    'id': attempt.id,
+                    'quiz_id': attempt.quiz_id,
+                    'quiz_title': attempt.quiz.title if attempt.quiz else None,
+                    'started_at': attempt.started_at.isoformat() if attempt.started_at else None,
+                    'completed_at': attempt.completed_at.isoformat() if attempt.completed_at else None,
+                    'score': attempt.score,
+                    'max_score': attempt.max_score,
+                    'percentage': attempt.percentage,
+                    'is_passed': attempt.is_passed,
+                    'time_taken': attempt.time_taken,
+                    'status': attempt.status
+                }
+                for attempt in attempts
+            ],
+            'next_cursor': attempts[-1].id if has_more else None
+        })
+    except Exception as e:
+        logger.error(f"User attempts error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/quizzes')
 @admin_required
 def quizzes():
     """Quiz management page"""
     try:
-        quizzes = db_manager.get_all_quizzes()
+        quizzes = db_manager.get_all_quizzes(limit=None)
         
         # Add analytics to each quiz
-        quiz_data = []
-        for quiz in quizzes:
-            analytics = db_manager.get_quiz_analytics(quiz.id)
-            quiz_data.append({
-                'quiz': quiz,
-                'analytics': analytics
-            })
+        analytics_by_quiz = db_manager.get_quiz_analytics_bulk([quiz.id for quiz in quizzes])
+        quiz_data = [
+            {'quiz': quiz, 'analytics': analytics_by_quiz[quiz.id]}
+            for quiz in quizzes
+        ]
         
         return render_template('quizzes.html', quiz_data=quiz_data)
     
@@ -286,21 +444,27 @@ def quizzes():
 def quiz_detail(quiz_id):
     """Quiz detail page"""
     try:
-        quiz = db_manager.get_quiz_by_id(quiz_id)
-        if not quiz:
+        version = db_manager.get_quiz_version(quiz_id)
+        if not version:
             flash('Quiz not found.', 'error')
             return redirect(url_for('quizzes'))
         
-        # Get quiz analytics
-        analytics = db_manager.get_quiz_analytics(quiz_id)
-        
-        # Get recent attempts
-        attempts = db_manager.get_quiz_attempts(quiz_id, limit=20)
+        def build():
+            quiz = db_manager.get_quiz_by_id(quiz_id)
+            
+            # Get quiz analytics
+            analytics = db_manager.get_quiz_analytics(quiz_id)
+            
+            # Get recent attempts
+            attempts = db_manager.get_quiz_attempts(quiz_id, limit=20)
+            
+            return render_template('quiz_detail.html',
+                                 quiz=quiz,
+                                 analytics=analytics,
+                                 attempts=attempts)
         
-        return render_template('quiz_detail.html',
-                             quiz=quiz,
-                             analytics=analytics,
-                             attempts=attempts)
+        # Revalidated on every load; unchanged quizzes answer 304 after the one version query
+        return conditional_response(build, 'quiz', quiz_id, *version)
     
     except Exception as e:
         logger.error(f"Quiz detail error: {e}")
@@ -314,35 +478,37 @@ def analytics():
     try:
         # Get date range from request
         days = request.args.get('days', 30, type=int)
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        
-        # Get analytics data
-        stats = db_manager.get_system_stats()
-        
-        # Get daily activity data
-        daily_activity = db_manager.get_daily_activity(start_date, end_date)
-        
-        # Get quiz performance data
-        quiz_performance = []
-        quizzes = db_manager.get_all_quizzes()
-        
-        for quiz in quizzes:
-            analytics = db_manager.get_quiz_analytics(quiz.id)
-            if analytics['total_attempts'] > 0:
-                quiz_performance.append({
-                    'quiz': quiz,
-                    'analytics': analytics
-                })
-        
-        # Sort by total attempts
-        quiz_performance.sort(key=lambda x: x['analytics']['total_attempts'], reverse=True)
-        
-        return render_template('analytics.html',
-                             stats=stats,
-                             daily_activity=daily_activity,
-                             quiz_performance=quiz_performance,
-                             days=days)
+        
+        def build():
+            # Snapped to the bucket so every request within it renders, and caches, the same page
+            end_date = analytics_bucket()
+            start_date = end_date - timedelta(days=days)
+            
+            # Get analytics data
+            stats = db_manager.get_system_stats()
+            
+            # Get daily activity data
+            daily_activity = db_manager.get_daily_activity(start_date, end_date)
+            
+            # Get quiz performance data
+            quizzes = db_manager.get_all_quizzes(limit=None)
+            analytics_by_quiz = db_manager.get_quiz_analytics_bulk([quiz.id for quiz in quizzes])
+            quiz_performance = [
+                {'quiz': quiz, 'analytics': analytics_by_quiz[quiz.id]}
+                for quiz in quizzes
+                if analytics_by_quiz[quiz.id].get('total_attempts', 0) > 0
+            ]
+            
+            # Sort by total attempts
+            quiz_performance.sort(key=lambda x: x['analytics']['total_attempts'], reverse=True)
+            
+            return render_template('analytics.html',
+                                 stats=stats,
+                                 daily_activity=daily_activity,
+                                 quiz_performance=quiz_performance,
+                                 days=days)
+        
+        return bucketed_response(build, 'analytics', days)
     
     except Exception as e:
         logger.error(f"Analytics page error: {e}")
@@ -361,9 +527,11 @@ def export_data(export_type):
     """Export data in various formats"""
     try:
         quiz_id = request.args.get('quiz_id', type=int)
+        # CSV exports are streamed to the client as they are written
+        chunks = None
         
         if export_type == 'quiz_results_csv':
-            data = export_service.export_quiz_results_csv(quiz_id)
+            chunks = export_service.iter_quiz_results_csv(quiz_id)
             filename = f"quiz_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
             mimetype = 'text/csv'
         
@@ -373,12 +541,12 @@ def export_data(export_type):
             mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         
         elif export_type == 'users_csv':
-            data = export_service.export_users_csv()
+            chunks = export_service.iter_users_csv()
             filename = f"users_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
             mimetype = 'text/csv'
         
         elif export_type == 'quizzes_csv':
-            data = export_service.export_quizzes_csv()
+            chunks = export_service.iter_quizzes_csv()
             filename = f"quizzes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
             mimetype = 'text/csv'
         
@@ -403,6 +571,13 @@ def export_data(export_type):
             }
         )
         
+        if chunks is not None:
+            return Response(
+                stream_with_context(chunks),
+                mimetype=mimetype,
+                headers={'Content-Disposition': f'attachment; filename={filename}'}
+            )
+        
         return send_file(
             io.BytesIO(data),
             mimetype=mimetype,
@@ -473,7 +648,8 @@ def delete_backup(backup_name):
 def logs():
     """System logs page"""
     try:
-        page = request.args.get('page', 1, type=int)
+        after_ts = request.args.get('after_ts')
+        after_id = request.args.get('after_id', type=int)
         per_page = 50
         
         logs_query = db_manager.session.query(SystemLog)
@@ -492,26 +668,40 @@ def logs():
         if end_date:
             logs_query = logs_query.filter(SystemLog.created_at <= end_date)
         
-        logs_pagination = logs_query.order_by(
-            SystemLog.created_at.desc()
-        ).paginate(page=page, per_page=per_page, error_out=False)
-        
-        # Get unique event types for filter
-        event_types = db_manager.session.query(SystemLog.event_type).distinct().all()
-        event_types = [et[0] for et in event_types]
-        
-        return render_template('logs.html',
-                             logs=logs_pagination.items,
-                             pagination=logs_pagination,
-                             event_types=event_types,
-                             current_event_type=event_type,
-                             start_date=start_date,
-                             end_date=end_date)
+        # Keyset pagination on (created_at, id): the next page starts below the last row shown
+        if after_ts and after_id:
+            logs_query = logs_query.filter(
+                tuple_(SystemLog.created_at, SystemLog.id) < (datetime.fromisoformat(after_ts), after_id)
+            )
+        logs_page, has_more = keyset_page(
+            logs_query.order_by(SystemLog.created_at.desc(), SystemLog.id.desc()), per_page
+        )
+        next_cursor = (
+            {'after_ts': logs_page[-1].created_at.isoformat(), 'after_id': logs_page[-1].id}
+            if has_more else None
+        )
+        
+        event_types = db_manager.get_log_event_types()
+        
+        def build():
+            return render_template('logs.html',
+                                 logs=logs_page,
+                                 next_cursor=next_cursor,
+                                 event_types=event_types,
+                                 current_event_type=event_type,
+                                 start_date=start_date,
+                                 end_date=end_date)
+        
+        # Batched log inserts can land out of created_at order, so validate against the rows actually on
+        # the page rather than a timestamp, and revalidate every page including those behind a cursor
+        return conditional_response(
+            build, 'logs', tuple(log.id for log in logs_page), has_more, tuple(event_types)
+        )
     
     except Exception as e:
         logger.error(f"Logs page error: {e}")
         flash('Error loading logs data.', 'error')
-        return render_template('logs.html', logs=[], pagination=None, event_types=[])
+        return render_template('logs.html', logs=[], next_cursor=None, event_types=[])
 
 @app.route('/settings')
 @super_admin_required
@@ -540,19 +730,75 @@ def settings():
 def api_stats():
     """API endpoint for dashboard statistics"""
     try:
-        stats = db_manager.get_system_stats()
-        return jsonify(stats)
+        return bucketed_response(lambda: jsonify(db_manager.get_system_stats()), 'stats')
     except Exception as e:
         logger.error(f"API stats error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/recent_attempts')
+@admin_required
+def api_recent_attempts():
+    """API endpoint for the dashboard's latest completed attempts"""
+    try:
+        # The user and quiz each row displays are joined in
+        attempts = db_manager.session.query(QuizAttempt).options(
+            joinedload(QuizAttempt.user),
+            joinedload(QuizAttempt.quiz)
+        ).filter(
+            QuizAttempt.status == 'completed'
+        ).order_by(QuizAttempt.completed_at.desc()).limit(10).all()
+        return jsonify([{
+            'id': attempt.id,
+            'user': attempt.user.username or attempt.user.first_name,
+            'quiz': attempt.quiz.title,
+            'percentage': attempt.percentage,
+            'is_passed': attempt.is_passed,
+            'completed_at': attempt.completed_at
+        } for attempt in attempts])
+    except Exception as e:
+        logger.error(f"API recent attempts error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/recent_logs')
+@admin_required
+def api_recent_logs():
+    """API endpoint for the dashboard's latest system logs"""
+    try:
+        # Only the shown columns, walking ix_system_logs_created_at_id; the metadata JSON is never read
+        logs = db_manager.session.query(
+            SystemLog.id, SystemLog.event_type, SystemLog.message, SystemLog.created_at
+        ).order_by(SystemLog.created_at.desc(), SystemLog.id.desc()).limit(20).all()
+        return jsonify([log._asdict() for log in logs])
+    except Exception as e:
+        logger.error(f"API recent logs error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/top_quizzes')
+@admin_required
+def api_top_quizzes():
+    """API endpoint for the dashboard's quiz performance grid"""
+    def build():
+        quizzes = db_manager.get_all_quizzes(limit=10)
+        analytics_by_quiz = db_manager.get_quiz_analytics_bulk([quiz.id for quiz in quizzes])
+        return jsonify([{
+            'id': quiz.id,
+            'title': quiz.title,
+            'is_active': quiz.is_active,
+            'analytics': analytics_by_quiz[quiz.id]
+        } for quiz in quizzes])
+    
+    try:
+        return bucketed_response(build, 'top_quizzes')
+    except Exception as e:
+        logger.error(f"API top quizzes error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/quiz/<int:quiz_id>/analytics')
 @admin_required
 def api_quiz_analytics(quiz_id):
     """API endpoint for quiz analytics"""
     try:
-        analytics = db_manager.get_quiz_analytics(quiz_id)
-        return jsonify(analytics)
+        return bucketed_response(lambda: jsonify(db_manager.get_quiz_analytics(quiz_id)), 'quiz', quiz_id)
     except Exception as e:
         logger.error(f"API quiz analytics error: {e}")
         return jsonify({'error': str(e)}), 500
@@ -562,7 +808,7 @@ def api_quiz_analytics(quiz_id):
 def api_toggle_user_status(user_id):
     """API endpoint to toggle user active status"""
     try:
-        user = db_manager.get_user_by_id(user_id)
+        user = db_manager.get_user_status(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -595,7 +841,7 @@ def api_toggle_user_status(user_id):
 def api_toggle_quiz_status(quiz_id):
     """API endpoint to toggle quiz active status"""
     try:
-        quiz = db_manager.get_quiz_by_id(quiz_id)
+        quiz = db_manager.get_quiz_status(quiz_id)
         if not quiz:
             return jsonify({'error': 'Quiz not found'}), 404
         
@@ -644,6 +890,7 @@ if __name__ == '__main__':
     # Start backup scheduler
     backup_service.start_backup_scheduler()
     
+    # Development server; in production serve with: gunicorn -c gunicorn_conf.py web_dashboard:app
     app.run(
         host=config.FLASK_HOST,
         port=config.FLASK_PORT,